@@ -0,0 +1,334 @@
+"""Benchmarks for the G-code to RML-1 converter
+
+Generates deterministic synthetic G-code workloads and times the converter
+stages separately. Results are printed as JSON and can be saved as a
+baseline and compared against later runs:
+
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from main import GCode2RMLConverter, RMLWriter, Vector, DEFAULT_SETTING_FILE
+
+
+# ==================== Synthetic Workloads ====================
+
+def generate_raster(rng, size):
+    """Long G01 raster scan over a height field"""
+    yield "%"
+    yield "G90 G21 G17 G94"
+    yield "M3 S12000"
+    yield "G0 Z5.000"
+    yield "G0 X0.000 Y0.000"
+    yield "G1 Z-0.500 F600"
+    width = 100.0
+    rows = max(1, size // 200)
+    step = width / 200
+    for row in range(rows):
+        y = row * 0.25
+        for col in range(200):
+            x = col * step if row % 2 == 0 else width - col * step
+            z = -0.5 + 0.3 * math.sin(x / 7.0) * math.cos(y / 5.0) + rng.uniform(-0.01, 0.01)
+            yield f"X{x:.3f} Y{y:.3f} Z{z:.3f}"
+    yield "G0 Z5.000"
+    yield "M5"
+    yield "M30"
+    yield "%"
+
+
+def generate_pocket(rng, size, plane):
+    """Dense G02/G03 arcs in one plane (17: XY / 18: XZ / 19: YZ)"""
+    axes = {17: ("X", "Y", "I", "J"), 18: ("Z", "X", "K", "I"), 19: ("Y", "Z", "J", "K")}[plane]
+    a, b, i, j = axes
+    yield "%"
+    yield f"G90 G21 G{plane} G94"
+    yield "M3 S12000"
+    yield "G0 X0.000 Y0.000 Z5.000"
+    yield "G1 Z-1.000 F400"
+    radius = angle = 0.0
+    direction = 3
+    for n in range(size):
+        if n % 8 == 0:
+            # Next ring of the pocket, alternating between climb and conventional
+            radius = rng.uniform(0.5, 20.0)
+            angle = 0.0
+            direction = 5 - direction
+            yield f"G1 {a}{radius:.4f} {b}0.0000"
+        start_a = radius * math.cos(angle)
+        start_b = radius * math.sin(angle)
+        step = rng.uniform(0.2, 1.5)
+        angle += step if direction == 3 else -step
+        end_a = radius * math.cos(angle)
+        end_b = radius * math.sin(angle)
+        yield f"G{direction} {a}{end_a:.4f} {b}{end_b:.4f} {i}{-start_a:.4f} {j}{-start_b:.4f}"
+    yield "G0 Z5.000"
+    yield "M5"
+    yield "M30"
+    yield "%"
+
+
+def generate_comments(rng, size):
+    """CAM-style output with long parenthesised comments on most lines"""
+    yield "%"
+    yield "(Program generated by a synthetic post-processor)"
+    yield "(Tool: 3.175 mm flat end mill, stock: 100 x 100 x 10 mm)"
+    yield "G90 G21 G17 G94 (absolute, metric, XY plane, feed per minute)"
+    yield "M3 S12000 (spindle on)"
+    for n in range(size):
+        x = rng.uniform(0, 100)
+        y = rng.uniform(0, 100)
+        z = rng.uniform(-2, 0)
+        if n % 10 == 0:
+            yield f"(Operation {n // 10}: contour pass at depth {z:.3f} mm, stepover 40 percent)"
+        yield f"N{n} G1 X{x:.3f} Y{y:.3f} Z{z:.3f} F{600 + (n % 3) * 100} (segment {n} of contour)"
+    yield "M5 (spindle off)"
+    yield "M30"
+    yield "%"
+
+
+def generate_incremental(rng, size):
+    """Incremental G91 sections between absolute repositioning moves"""
+    yield "%"
+    yield "G90 G21 G17 G94"
+    yield "M3 S12000"
+    for n in range(size):
+        if n % 100 == 0:
+            yield "G90"
+            yield f"G0 X{rng.uniform(0, 100):.3f} Y{rng.uniform(0, 100):.3f} Z1.000"
+            yield "G91"
+        yield f"G1 X{rng.uniform(-1, 1):.3f} Y{rng.uniform(-1, 1):.3f} Z{rng.uniform(-0.05, 0.05):.3f} F500"
+    yield "G90"
+    yield "M5"
+    yield "M30"
+    yield "%"
+
+
+WORKLOADS = {
+    "raster": lambda rng, size: generate_raster(rng, size),
+    "pocket_xy": lambda rng, size: generate_pocket(rng, size // 20, 17),
+    "pocket_xz": lambda rng, size: generate_pocket(rng, size // 20, 18),
+    "pocket_yz": lambda rng, size: generate_pocket(rng, size // 20, 19),
+    "comments": lambda rng, size: generate_comments(rng, size),
+    "incremental": lambda rng, size: generate_incremental(rng, size),
+}
+
+
+def write_workload(name, path, size, seed=0):
+    """Write a workload file and return its number of lines"""
+    rng = random.Random(f"{name}-{seed}")
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in WORKLOADS[name](rng, size):
+            f.write(line + "\n")
+            count += 1
+    return count
+
+
+# ==================== Measurements ====================
+
+def quiet_converter():
+    converter = GCode2RMLConverter()
+    converter.callback_log = lambda message: None
+    return converter
+
+
+def best_time(function, repeat):
+    """Fastest of several runs, in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def bench_workload(name, directory, size, repeat):
+    input_path = os.path.join(directory, name + ".nc")
+    output_path = os.path.join(directory, name + ".rml")
+    lines = write_workload(name, input_path, size)
+
+    # Full conversion
+    convert_s = best_time(lambda: quiet_converter().convert(input_path, output_path, DEFAULT_SETTING_FILE), repeat)
+    with open(output_path, 'r', encoding='utf-8') as f:
+        commands = [command + ";" for command in f.read().split(";") if command]
+    moves = sum(1 for command in commands if command[0] == 'Z')
+
+    # Tokenizer alone
+    def tokenize():
+        converter = quiet_converter()
+        with open(input_path, 'rb') as f:
+            for _ in converter.tokenize(converter.read_lines(f)):
+                pass
+    tokenize_s = best_time(tokenize, repeat)
+
+    # Writing the produced commands
+    def write():
+        with open(output_path, 'w', encoding='utf-8') as f:
+            writer = RMLWriter(f)
+            for command in commands:
+                writer.write(command)
+            writer.flush()
+    write_s = best_time(write, repeat)
+
+    # Peak memory of a conversion (separate run, tracing slows it down)
+    tracemalloc.start()
+    quiet_converter().convert(input_path, output_path, DEFAULT_SETTING_FILE)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "lines": lines,
+        "moves": moves,
+        "convert_s": convert_s,
+        "tokenize_s": tokenize_s,
+        "write_s": write_s,
+        "lines_per_s": lines / convert_s,
+        "moves_per_s": moves / convert_s,
+        "tokenize_lines_per_s": lines / tokenize_s,
+        "write_moves_per_s": moves / write_s,
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def bench_arcs(count, repeat):
+    """circular_interpolation alone: half circles of varying radius"""
+    moves = []
+
+    def run():
+        moves.clear()
+        converter = quiet_converter()
+        converter.emit = moves.append
+        rng = random.Random("arcs")
+        for n in range(count):
+            radius = rng.uniform(0.5, 20.0)
+            converter.current_pos = Vector(radius, 0.0, 0.0)
+            converter.circular_interpolation(Vector(-radius, 0.0, -1.0), Vector(-radius, 0.0, 0.0),
+                                             17, 2 + n % 2, 600.0)
+
+    arcs_s = best_time(run, repeat)
+    return {
+        "arcs": count,
+        "moves": len(moves),
+        "arcs_s": arcs_s,
+        "arcs_per_s": count / arcs_s,
+        "moves_per_s": len(moves) / arcs_s,
+    }
+
+
+def bench_moves(count, repeat):
+    """move() alone, with the number of Vector objects allocated per move"""
+    converter = quiet_converter()
+    converter.emit = lambda command: None
+    rng = random.Random("moves")
+    positions = [Vector(rng.uniform(0, 100), rng.uniform(0, 100), rng.uniform(-2, 0)) for _ in range(count)]
+
+    def run():
+        for position in positions:
+            converter.move(position, 600.0)
+
+    moves_s = best_time(run, repeat)
+
+    # Count the Vector objects created while moving
+    created = [0]
+    original_init = Vector.__init__
+
+    def counting_init(self, *args):
+        created[0] += 1
+        original_init(self, *args)
+
+    Vector.__init__ = counting_init
+    try:
+        run()
+    finally:
+        Vector.__init__ = original_init
+
+    return {
+        "moves": count,
+        "moves_s": moves_s,
+        "moves_per_s": count / moves_s,
+        "vectors_per_move": created[0] / count,
+    }
+
+
+def run_benchmarks(size, repeat, names):
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "size": size,
+        "workloads": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for name in names:
+            results["workloads"][name] = bench_workload(name, directory, size, repeat)
+    results["arcs"] = bench_arcs(max(1, size // 20), repeat)
+    results["moves"] = bench_moves(size, repeat)
+    return results
+
+
+# ==================== Baseline Comparison ====================
+
+# Throughput metrics compared against a baseline (higher is better)
+RATE_METRICS = ("lines_per_s", "moves_per_s", "tokenize_lines_per_s", "write_moves_per_s", "arcs_per_s")
+
+
+def compare(results, baseline, tolerance):
+    """Print throughput ratios against a baseline, returning the regressed metrics"""
+    regressions = []
+    sections = [(name, results[name], baseline.get(name, {})) for name in ("arcs", "moves")]
+    sections += [(name, values, baseline.get("workloads", {}).get(name, {}))
+                 for name, values in results["workloads"].items()]
+    for name, current, previous in sections:
+        for metric in RATE_METRICS:
+            if metric not in current or not previous.get(metric):
+                continue
+            ratio = current[metric] / previous[metric]
+            flag = ""
+            if ratio < 1 - tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{name}.{metric}")
+            print(f"{name:<12} {metric:<22} {previous[metric]:>14.0f} -> {current[metric]:>14.0f}  "
+                  f"x{ratio:.2f}{flag}", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the G-code to RML-1 converter")
+    parser.add_argument("--size", type=int, default=20000, help="approximate lines per workload")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the fastest is kept")
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS),
+                        help="workload to run (default: all)")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed throughput drop against the baseline (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.size, args.repeat, args.workload or list(WORKLOADS))
+    print(json.dumps(results, indent=2))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
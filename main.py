@@ -1,589 +1,4412 @@
-import os
-import re
-import math
-import tkinter as tk
-from tkinter import ttk
-from tkinter import filedialog, messagebox, scrolledtext
-import threading
-
-
-# ==================== Vector Operations ====================
-
-class Vector:
-    def __init__(self, x=0.0, y=0.0, z=0.0):
-        self.x = x
-        self.y = y
-        self.z = z
-
-    @staticmethod
-    def get(x, y, z):
-        return Vector(x, y, z)
-
-    def add(self, other):
-        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
-
-    def sub(self, other):
-        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
-
-    def dot(self, other):
-        return self.x * other.x + self.y * other.y + self.z * other.z
-
-    def size(self):
-        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
-
-    def scale(self, scale):
-        return Vector(self.x * scale, self.y * scale, self.z * scale)
-
-    def cross(self, other):
-        return Vector(
-            self.y * other.z - self.z * other.y,
-            self.z * other.x - self.x * other.z,
-            self.x * other.y - self.y * other.x
-        )
-
-    def norm(self):
-        size = self.size()
-        if size == 0:
-            return Vector(0, 0, 0)
-        return Vector(self.x / size, self.y / size, self.z / size)
-
-    def __str__(self):
-        return f"({self.x}, {self.y}, {self.z})"
-
-
-# ==================== G-code to RML-1 Converter ====================
-
-class GCode2RMLConverter:
-    def __init__(self):
-        # Imported settings
-        self.home_position = Vector(0.0, 0.0, 0.0)
-        self.pos_offset = Vector(0.0, 0.0, 0.0)
-        self.rapid_feed_speed = 1000.0
-        self.circular_resolution = 360.0
-
-        # Processing state
-        self.abs_inc = 90  # 90: abs / 91: inc
-        self.mm_in = 21  # 20: inches / 21: millimeters
-        self.mov_mode = 0  # 0: rapid / 1: linear / 2: CW circle / 3: CCW circle / 28: return home
-        self.plane_select = 17  # 17: XY / 18: XZ / 19: YZ
-        self.TLOC_mode = 49  # 43: positive / 44: negative / 49: canceled
-        self.TROC_mode = 40  # 40: canceled / 41: left / 42: right
-        self.feed_mode = 94  # 94: per min / 95: per rev
-        self.coor_sys = 1
-
-        self.next_pos = Vector(0, 0, 0)
-        self.center_pos_inc = Vector(0, 0, 0)
-        self.current_pos = Vector(0, 0, 0)
-
-        self.feed_speed = 0
-        self.spindle_speed = 0
-        self.spindle_state = 0  # 0: stop / 1: CW / -1: CCW
-        self.program_number = 0
-        self.next_tool_num = 0
-        self.TROC_tool_num = 0
-        self.TLOC_tool_num = 0
-        self.dwell_enable = 0
-        self.coor_changed = 0
-
-        self.output_lines = []
-
-        self.callback_progress = None
-        self.callback_log = None
-
-    def log(self, message):
-        if self.callback_log:
-            self.callback_log(message)
-
-    def import_settings(self, setting_file_path):
-        """Import settings from setting.txt file"""
-        try:
-            with open(setting_file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip()
-                        value = value.strip()
-
-                        if key == "homePosition":
-                            # Remove parentheses and spaces
-                            value = value.replace('(', '').replace(')', '').replace(' ', '')
-                            coords = value.split(',')
-                            if len(coords) == 3:
-                                self.home_position = Vector(float(coords[0]), float(coords[1]), float(coords[2]))
-                        elif key == "posOffset":
-                            value = value.replace('(', '').replace(')', '').replace(' ', '')
-                            coords = value.split(',')
-                            if len(coords) == 3:
-                                self.pos_offset = Vector(float(coords[0]), float(coords[1]), float(coords[2]))
-                        elif key == "rapidFeedSpeed":
-                            self.rapid_feed_speed = float(value)
-                        elif key == "circularResolution":
-                            self.circular_resolution = float(value)
-        except Exception as e:
-            self.log(f"Error reading settings: {e}")
-
-    def plane_conv(self, vect, plane):
-        """Coordinate transformation for selected plane"""
-        if plane == 17:  # XY plane
-            return Vector(vect.x, vect.y, vect.z)
-        elif plane == 18:  # XZ plane
-            return Vector(vect.z, vect.x, vect.y)
-        elif plane == 19:  # YZ plane
-            return Vector(vect.y, vect.z, vect.x)
-        return vect
-
-    def plane_conv_inv(self, vect, plane):
-        """Inverse coordinate transformation"""
-        if plane == 17:  # XY plane
-            return Vector(vect.x, vect.y, vect.z)
-        elif plane == 18:  # XZ plane
-            return Vector(vect.y, vect.z, vect.x)
-        elif plane == 19:  # YZ plane
-            return Vector(vect.z, vect.x, vect.y)
-        return vect
-
-    def move(self, next_pos, feed_speed):
-        """Generate movement command"""
-        # Scaling and offset
-        output_pos = next_pos.add(self.pos_offset)
-        output_pos = output_pos.scale(100.0)
-        output_pos = output_pos.add(Vector(0.5, 0.5, 0.5))
-
-        # Format coordinates as integers
-        x = int(output_pos.x)
-        y = int(output_pos.y)
-        z = int(output_pos.z)
-
-        # Add speed command if changed
-        if not hasattr(self, 'last_feed_speed') or feed_speed != self.last_feed_speed:
-            speed_cmd = f"V{feed_speed / 60:.1f};"
-            self.output_lines.append(speed_cmd)
-            self.last_feed_speed = feed_speed
-
-        # Movement command
-        move_cmd = f"Z{x},{y},{z};"
-        self.output_lines.append(move_cmd)
-
-        # Update current position
-        self.current_pos = next_pos
-
-    def rapid_positioning(self, next_pos):
-        """Handle G00 - rapid positioning"""
-        self.move(next_pos, self.rapid_feed_speed)
-
-    def linear_interpolation(self, next_pos, feed_speed):
-        """Handle G01 - linear interpolation"""
-        self.move(next_pos, feed_speed)
-
-    def circular_interpolation(self, next_pos, center_pos_inc, plane_select, direction, feed_speed):
-        """Handle G02/G03 - circular interpolation"""
-        mid_current_pos = self.plane_conv(self.current_pos, plane_select)
-        mid_next_pos = self.plane_conv(next_pos, plane_select)
-        mid_center_pos_inc = self.plane_conv(center_pos_inc, plane_select)
-        mid_center_pos = self.current_pos.add(mid_center_pos_inc)
-
-        mid_start_pos = mid_current_pos
-        mid_delta1 = mid_current_pos.sub(mid_center_pos)
-        mid_delta2 = mid_next_pos.sub(mid_center_pos)
-
-        # Zero Z for calculations in the plane
-        mid_delta1.z = 0.0
-        mid_delta2.z = 0.0
-
-        # Calculate angle
-        delta_angle = math.acos(mid_delta1.dot(mid_delta2) / (mid_delta2.size() * mid_delta1.size()))
-        if delta_angle <= 0:
-            delta_angle += 2 * math.pi
-
-        # Number of steps
-        delta_steps = int(self.circular_resolution * delta_angle / (2 * math.pi))
-
-        for step in range(delta_steps):
-            theta_temp = 2 * math.pi * step / self.circular_resolution
-            if direction == 2:  # Clockwise
-                theta_temp *= -1
-
-            # Calculate intermediate point
-            pos = Vector()
-            pos.x = (mid_delta1.x * math.cos(theta_temp) +
-                     mid_delta1.y * math.sin(-theta_temp) +
-                     mid_center_pos.x)
-            pos.y = (mid_delta1.x * math.sin(theta_temp) +
-                     mid_delta1.y * math.cos(theta_temp) +
-                     mid_center_pos.y)
-            pos.z = ((mid_next_pos.z - mid_start_pos.z) *
-                     (theta_temp / delta_angle) + mid_start_pos.z)
-
-            # Transform back and move
-            actual_pos = self.plane_conv_inv(pos, plane_select)
-            self.move(actual_pos, feed_speed)
-            self.current_pos = actual_pos
-
-        # Final move to end point
-        self.move(next_pos, feed_speed)
-        self.current_pos = next_pos
-
-    def return_home(self, via_pos):
-        """Handle G28 - return to home position"""
-        self.rapid_positioning(via_pos)
-        self.rapid_positioning(self.home_position)
-
-    def process_word(self, address, value_str):
-        """Process a single G-code word"""
-        try:
-            if address == ';':  # End of block
-                if self.coor_changed == 0:
-                    return
-
-                if self.mov_mode == 0:
-                    self.rapid_positioning(self.next_pos)
-                elif self.mov_mode == 1:
-                    self.linear_interpolation(self.next_pos, self.feed_speed)
-                elif self.mov_mode == 2 or self.mov_mode == 3:
-                    self.circular_interpolation(self.next_pos, self.center_pos_inc,
-                                                self.plane_select, self.mov_mode, self.feed_speed)
-                elif self.mov_mode == 28:
-                    self.return_home(self.next_pos)
-
-                self.coor_changed = 0
-                self.center_pos_inc = Vector(0, 0, 0)
-
-            elif address == 'F':  # Feed rate
-                self.feed_speed = float(value_str)
-
-            elif address == 'G':  # G-codes
-                g_code = int(value_str)
-
-                if g_code == 0:  # Rapid positioning
-                    self.mov_mode = 0
-                elif g_code == 1:  # Linear interpolation
-                    self.mov_mode = 1
-                elif g_code == 2:  # Circular interpolation CW
-                    self.mov_mode = 2
-                elif g_code == 3:  # Circular interpolation CCW
-                    self.mov_mode = 3
-                elif g_code == 4:  # Dwell
-                    self.dwell_enable = 1
-                elif g_code == 17:  # XY plane
-                    self.plane_select = 17
-                elif g_code == 18:  # XZ plane
-                    self.plane_select = 18
-                elif g_code == 19:  # YZ plane
-                    self.plane_select = 19
-                elif g_code == 20:  # Inches
-                    self.mm_in = 20
-                elif g_code == 21:  # Millimeters
-                    self.mm_in = 21
-                elif g_code == 28:  # Return home
-                    self.mov_mode = 28
-                elif g_code == 40:  # Cutter radius compensation off
-                    self.TROC_mode = 40
-                    self.TROC_tool_num = 0
-                elif g_code == 41:  # Cutter radius compensation left
-                    self.TROC_mode = 41
-                elif g_code == 42:  # Cutter radius compensation right
-                    self.TROC_mode = 42
-                elif g_code == 43:  # Tool length compensation positive
-                    self.TLOC_mode = 43
-                elif g_code == 44:  # Tool length compensation negative
-                    self.TLOC_mode = 44
-                elif g_code == 49:  # Tool length compensation cancel
-                    self.TLOC_mode = 49
-                elif 54 <= g_code <= 59:  # Coordinate systems
-                    self.coor_sys = g_code - 54
-                elif g_code == 90:  # Absolute coordinates
-                    self.abs_inc = 90
-                    self.output_lines.append("^PA;")
-                elif g_code == 91:  # Relative coordinates
-                    self.abs_inc = 91
-                    self.output_lines.append("^PR;")
-                elif g_code == 94:  # Feed per minute
-                    self.feed_mode = 94
-                elif g_code == 95:  # Feed per revolution
-                    self.feed_mode = 95
-
-            elif address == 'I':  # Center offset X
-                self.center_pos_inc.x = float(value_str)
-            elif address == 'J':  # Center offset Y
-                self.center_pos_inc.y = float(value_str)
-            elif address == 'K':  # Center offset Z
-                self.center_pos_inc.z = float(value_str)
-
-            elif address == 'M':  # M-codes
-                m_code = int(value_str)
-
-                if m_code == 3:  # Spindle CW
-                    self.spindle_state = 1
-                    self.output_lines.append("!RC15;!MC1;")
-                elif m_code == 4:  # Spindle CCW
-                    self.spindle_state = -1
-                    self.output_lines.append("!RC15;!MC1;")
-                elif m_code == 5:  # Spindle stop
-                    self.spindle_state = 0
-                    self.output_lines.append("!MC0;")
-
-            elif address == 'S':  # Spindle speed
-                self.spindle_speed = float(value_str)
-
-            elif address == 'X':  # X coordinate
-                val = float(value_str)
-                if self.abs_inc == 91:
-                    self.next_pos.x += val
-                else:
-                    self.next_pos.x = val
-                self.coor_changed = 1
-
-            elif address == 'Y':  # Y coordinate
-                val = float(value_str)
-                if self.abs_inc == 91:
-                    self.next_pos.y += val
-                else:
-                    self.next_pos.y = val
-                self.coor_changed = 1
-
-            elif address == 'Z':  # Z coordinate
-                val = float(value_str)
-                if self.abs_inc == 91:
-                    self.next_pos.z += val
-                else:
-                    self.next_pos.z = val
-                self.coor_changed = 1
-
-        except ValueError as e:
-            self.log(f"Value conversion error: {address}{value_str} - {e}")
-
-    def convert(self, input_file_path, output_file_path):
-        """Main conversion method"""
-        self.log("Starting conversion...")
-
-        # Import settings
-        setting_file = os.path.join(os.path.dirname(__file__), "setting.txt")
-        if os.path.exists(setting_file):
-            self.import_settings(setting_file)
-        else:
-            self.log("Settings file setting.txt not found, using default values")
-
-        # Read input file
-        try:
-            with open(input_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-        except Exception as e:
-            self.log(f"Error reading file: {e}")
-            return False
-
-        # Initialize output file
-        self.output_lines = []
-        self.output_lines.append(";;^IN;")
-        self.output_lines.append("V85.0;")
-        self.output_lines.append("^PR;")
-        self.output_lines.append("Z0,0,15500;")
-        self.output_lines.append("^PA;")
-
-        # Parse G-code
-        lines = content.split('\n')
-        total_lines = len(lines)
-
-        comment_mode = False
-        for i, line in enumerate(lines):
-            # Update progress
-            if self.callback_progress:
-                progress = (i + 1) / total_lines * 100
-                self.callback_progress(progress)
-
-            line = line.strip()
-            if not line:
-                continue
-
-            # Remove comments in parentheses
-            result_line = ""
-            for char in line:
-                if char == '(':
-                    comment_mode = True
-                elif char == ')':
-                    comment_mode = False
-                elif not comment_mode:
-                    result_line += char
-
-            line = result_line.strip()
-            if not line or line.startswith('%'):
-                continue
-
-            # Split into words
-            words = re.findall(r'[A-Z][^A-Z;]*', line)
-
-            for word in words:
-                if word:
-                    address = word[0]
-                    value = word[1:]
-                    self.process_word(address, value)
-
-            # Process end of line
-            self.process_word(';', '0')
-
-        # Final command
-        self.output_lines.append("^IN;")
-
-        # Write to output file
-        try:
-            with open(output_file_path, 'w', encoding='utf-8') as f:
-                f.write(''.join(self.output_lines))
-            self.log(f"Conversion completed successfully!\nFile saved: {output_file_path}")
-            return True
-        except Exception as e:
-            self.log(f"Error writing file: {e}")
-            return False
-
-
-# ==================== Graphical User Interface ====================
-
-class GCodeConverterGUI:
-    def __init__(self):
-        self.window = tk.Tk()
-        self.window.title("G-code to RML-1 Converter")
-        self.window.geometry("800x600")
-
-        self.converter = GCode2RMLConverter()
-        self.converter.callback_log = self.log_message
-        self.converter.callback_progress = self.update_progress
-
-        self.create_widgets()
-
-    def create_widgets(self):
-        # File selection frame
-        file_frame = tk.Frame(self.window)
-        file_frame.pack(pady=10, padx=10, fill=tk.X)
-
-        # Input file
-        tk.Label(file_frame, text="Input G-code file:").grid(row=0, column=0, sticky=tk.W, pady=5)
-        self.input_file_var = tk.StringVar()
-        tk.Entry(file_frame, textvariable=self.input_file_var, width=50).grid(row=0, column=1, padx=5)
-        tk.Button(file_frame, text="Browse...", command=self.browse_input_file).grid(row=0, column=2)
-
-        # Output file
-        tk.Label(file_frame, text="Output RML file:").grid(row=1, column=0, sticky=tk.W, pady=5)
-        self.output_file_var = tk.StringVar()
-        tk.Entry(file_frame, textvariable=self.output_file_var, width=50).grid(row=1, column=1, padx=5)
-        tk.Button(file_frame, text="Browse...", command=self.browse_output_file).grid(row=1, column=2)
-
-        # Progress bar
-        self.progress_var = tk.DoubleVar()
-        self.progress_bar = ttk.Progressbar(self.window, variable=self.progress_var, maximum=100)
-        self.progress_bar.pack(pady=10, padx=10, fill=tk.X)
-
-        # Control buttons
-        button_frame = tk.Frame(self.window)
-        button_frame.pack(pady=10)
-
-        tk.Button(button_frame, text="Convert", command=self.start_conversion,
-                  bg="lightblue", padx=20, pady=5).pack(side=tk.LEFT, padx=5)
-        tk.Button(button_frame, text="Clear Log", command=self.clear_log,
-                  bg="lightgray", padx=20, pady=5).pack(side=tk.LEFT, padx=5)
-        tk.Button(button_frame, text="Exit", command=self.window.quit,
-                  bg="lightcoral", padx=20, pady=5).pack(side=tk.LEFT, padx=5)
-
-        # Log
-        tk.Label(self.window, text="Execution log:").pack(anchor=tk.W, padx=10)
-
-        self.log_text = scrolledtext.ScrolledText(self.window, height=15)
-        self.log_text.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
-
-        # Status
-        self.status_var = tk.StringVar(value="Ready")
-        status_bar = tk.Label(self.window, textvariable=self.status_var,
-                              relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
-
-    def browse_input_file(self):
-        filename = filedialog.askopenfilename(
-            title="Select G-code file",
-            filetypes=[("G-code files", "*.nc;*.cnc;*.gcode;*.txt"), ("All files", "*.*")]
-        )
-        if filename:
-            self.input_file_var.set(filename)
-            # Auto-generate output filename
-            base = os.path.splitext(filename)[0]
-            self.output_file_var.set(base + ".rml")
-
-    def browse_output_file(self):
-        filename = filedialog.asksaveasfilename(
-            title="Save RML file as",
-            defaultextension=".rml",
-            filetypes=[("RML files", "*.rml"), ("All files", "*.*")]
-        )
-        if filename:
-            self.output_file_var.set(filename)
-
-    def log_message(self, message):
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.window.update_idletasks()
-
-    def update_progress(self, value):
-        self.progress_var.set(value)
-        self.status_var.set(f"Progress: {value:.1f}%")
-        self.window.update_idletasks()
-
-    def clear_log(self):
-        self.log_text.delete(1.0, tk.END)
-
-    def conversion_thread(self):
-        input_file = self.input_file_var.get()
-        output_file = self.output_file_var.get()
-
-        if not input_file:
-            messagebox.showerror("Error", "Select input file!")
-            return
-
-        if not output_file:
-            messagebox.showerror("Error", "Select output file!")
-            return
-
-        try:
-            success = self.converter.convert(input_file, output_file)
-            if success:
-                self.status_var.set("Conversion completed successfully!")
-                messagebox.showinfo("Success", "Conversion completed successfully!")
-            else:
-                self.status_var.set("Conversion error!")
-        except Exception as e:
-            self.log_message(f"Error: {e}")
-            self.status_var.set("Conversion error!")
-
-    def start_conversion(self):
-        # Run in separate thread to avoid blocking GUI
-        thread = threading.Thread(target=self.conversion_thread)
-        thread.daemon = True
-        thread.start()
-
-    def run(self):
-        self.window.mainloop()
-
-
-# ==================== Entry Point ====================
-
-if __name__ == "__main__":
-    # Create default settings file if it doesn't exist
-    setting_file = "setting.txt"
-    if not os.path.exists(setting_file):
-        default_settings = """# Home position
-homePosition = ( 0.0, 0.0, 0.0)
-
-# Output coordinate offset
-posOffset = ( 0.0, 0.0, 0.0 );
-
-# Rapid movement speed
-rapidFeedSpeed = 1000.0
-
-# Circular interpolation resolution (number of divisions per revolution)
-circularResolution = 360.0
-"""
-        with open(setting_file, 'w', encoding='utf-8') as f:
-            f.write(default_settings)
-
-    # Launch GUI
-    app = GCodeConverterGUI()
-    app.run()
+import os
+import re
+import sys
+import glob
+import math
+import mmap
+import time
+import argparse
+import queue
+import json
+import array
+import struct
+import shutil
+import hashlib
+import tempfile
+import functools
+import cProfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, arcs fall back to the pure-Python loop
+    np = None
+try:
+    import termios
+except ImportError:  # not on Windows, serial ports are then opened with pySerial
+    termios = None
+try:
+    import serial
+except ImportError:  # pySerial is optional
+    serial = None
+try:
+    import tkinter as tk
+    from tkinter import ttk
+    from tkinter import filedialog, messagebox, scrolledtext
+except ImportError:  # Python without Tk, only the command line is available
+    tk = None
+import threading
+
+
+DEFAULT_SETTING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "setting.txt")
+
+# Bump whenever a change alters the generated RML (invalidates cached results)
+CONVERTER_VERSION = "2.5"
+
+
+# ==================== Vector Operations ====================
+
+class Vector:
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    def get(x, y, z):
+        return Vector(x, y, z)
+
+    def add(self, other):
+        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def sub(self, other):
+        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def dot(self, other):
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def size(self):
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def scale(self, scale):
+        return Vector(self.x * scale, self.y * scale, self.z * scale)
+
+    def cross(self, other):
+        return Vector(
+            self.y * other.z - self.z * other.y,
+            self.z * other.x - self.x * other.z,
+            self.x * other.y - self.y * other.x
+        )
+
+    def norm(self):
+        size = self.size()
+        if size == 0:
+            return Vector(0, 0, 0)
+        return Vector(self.x / size, self.y / size, self.z / size)
+
+    def __str__(self):
+        return f"({self.x}, {self.y}, {self.z})"
+
+
+# ==================== Fixed-Point Coordinates ====================
+
+# Fixed-point coordinates are integer counts of 1e-6 mm, held in next_pos as their exact
+# float images (count / FIXED_SCALE) and turned back into counts for sums and rounding.
+# round(float(word) * FIXED_SCALE) is the exact count for words with up to 6 decimals:
+# the float error stays far below half a unit for coordinates under 2e9 mm.
+FIXED_SCALE = 10 ** 6
+RML_STEP = FIXED_SCALE // 100  # fixed-point units per RML unit (0.01 mm)
+RML_HALF_STEP = RML_STEP // 2
+
+
+# ==================== RML Output ====================
+
+# Commands starting every RML file
+RML_HEADER = (";;^IN;", "V85.0;", "^PR;", "Z0,0,15500;", "^PA;")
+
+# Process umask, read once: files replaced through temp_file_for() get the usual permissions
+UMASK = os.umask(0o022)
+os.umask(UMASK)
+
+
+def temp_file_for(path):
+    """Create an empty temporary file next to path, unique to the caller, and return its path"""
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                     dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    os.chmod(temp_path, 0o666 & ~UMASK)
+    return temp_path
+
+
+class RMLWriter:
+    """Buffered writer that flushes RML commands to a stream in fixed-size chunks"""
+
+    def __init__(self, stream, chunk_size=65536):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.buffered = 0
+        self.written = 0  # characters already passed to the stream
+
+    def write(self, command):
+        self.buffer.append(command)
+        self.buffered += len(command)
+        if self.buffered >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.stream.write(''.join(self.buffer))
+            self.written += self.buffered
+            self.buffer = []
+            self.buffered = 0
+
+    def position(self):
+        """Output offset of the next command"""
+        return self.written + self.buffered
+
+
+class RMLCompactor:
+    """Output stage that drops duplicate points and merges collinear runs of Z moves
+
+    Only absolute (^PA) moves are compacted. Any other command (V speed
+    changes, spindle and mode commands) flushes the pending move first, so
+    it keeps its place relative to the moves around it.
+
+    Every dropped point limits the direction of the merged segment from the
+    anchor to a cone around it; the run keeps a single cone inside all of
+    them, so each new point is checked in constant time.
+    """
+
+    # Slack on cone angles (radians) absorbing rounding on exactly collinear points
+    ANGLE_EPSILON = 1e-9
+
+    def __init__(self, write, tolerance=0.0):
+        self.downstream = write
+        self.tolerance = tolerance * 100.0  # RML units
+        self.absolute = True
+        self.anchor = None  # last written point
+        self.pending = None  # end of the current run, not yet written
+        self.cone = None  # (x, y, z, half angle) directions allowed for the merged segment, None: any
+        self.moves_in = 0
+        self.moves_out = 0
+
+    def write(self, command):
+        if command[0] != 'Z':
+            self.flush()
+            if command == "^PR;":
+                self.absolute = False
+                self.anchor = None
+            elif command == "^PA;":
+                self.absolute = True
+            self.downstream(command)
+            return
+
+        self.moves_in += 1
+        if not self.absolute:
+            self.moves_out += 1
+            self.downstream(command)
+            return
+
+        x, y, z = command[1:-1].split(',')
+        point = (int(x), int(y), int(z))
+        last = self.pending if self.pending is not None else self.anchor
+        if point == last:
+            return
+        if self.pending is not None and self.anchor is not None and self.extends_run(point):
+            self.pending = point
+            return
+
+        self.flush()
+        self.pending = point
+
+    def capture_state(self):
+        return {
+            "absolute": self.absolute,
+            "anchor": self.anchor,
+            "pending": self.pending,
+            "cone": self.cone,
+            "moves_in": self.moves_in,
+            "moves_out": self.moves_out,
+        }
+
+    def restore_state(self, state):
+        self.absolute = state["absolute"]
+        self.anchor = tuple(state["anchor"]) if state["anchor"] is not None else None
+        self.pending = tuple(state["pending"]) if state["pending"] is not None else None
+        self.cone = tuple(state["cone"]) if state["cone"] is not None else None
+        self.moves_in = state["moves_in"]
+        self.moves_out = state["moves_out"]
+
+    def intersect(self, cone, other):
+        """Largest cone inside both cones (unit axis x, y, z and half angle), None if they do not overlap"""
+        ux, uy, uz, angle1 = cone
+        vx, vy, vz, angle2 = other
+        if angle1 >= math.pi:
+            return other
+        if angle2 >= math.pi:
+            return cone
+        cx = uy * vz - uz * vy
+        cy = uz * vx - ux * vz
+        cz = ux * vy - uy * vx
+        sin_between = math.sqrt(cx * cx + cy * cy + cz * cz)
+        between = math.atan2(sin_between, ux * vx + uy * vy + uz * vz)
+        if between + angle2 <= angle1 + self.ANGLE_EPSILON:
+            return other
+        if between + angle1 <= angle2 + self.ANGLE_EPSILON:
+            return cone
+        if between > angle1 + angle2 + self.ANGLE_EPSILON or between > math.pi / 2:
+            return None
+        # Axis on the great circle between both axes, inside both cones
+        angle = (angle1 + angle2 - between) / 2
+        t = max(0.0, angle1 - angle)
+        w1 = math.sin(between - t) / sin_between
+        w2 = math.sin(t) / sin_between
+        x, y, z = w1 * ux + w2 * vx, w1 * uy + w2 * vy, w1 * uz + w2 * vz
+        length = math.sqrt(x * x + y * y + z * z)
+        return x / length, y / length, z / length, max(0.0, angle)
+
+    def limit(self, ex, ey, ez):
+        """Cone of directions from the anchor passing within tolerance of the point at offset e"""
+        distance = math.sqrt(ex * ex + ey * ey + ez * ez)
+        if distance <= self.tolerance:
+            return 1.0, 0.0, 0.0, math.pi
+        return ex / distance, ey / distance, ez / distance, math.asin(self.tolerance / distance)
+
+    def extends_run(self, point):
+        """Whether the segment anchor -> point still passes every dropped point and the pending one"""
+        ax, ay, az = self.anchor
+        px, py, pz = self.pending
+        qx, qy, qz = point
+        ex, ey, ez = px - ax, py - ay, pz - az
+        fx, fy, fz = qx - ax, qy - ay, qz - az
+
+        # The run must keep moving forward
+        if ex * (qx - px) + ey * (qy - py) + ez * (qz - pz) <= 0:
+            return False
+
+        # Squared distance of the pending point from the segment line, scaled by its squared length
+        cx = ey * fz - ez * fy
+        cy = ez * fx - ex * fz
+        cz = ex * fy - ey * fx
+        tolerance = self.tolerance
+        if cx * cx + cy * cy + cz * cz > tolerance * tolerance * (fx * fx + fy * fy + fz * fz):
+            return False
+        if tolerance == 0 or self.cone is None:
+            # Exact so far: with no tolerance every dropped point lies on the line anchor -> pending
+            if tolerance != 0:
+                self.cone = self.limit(ex, ey, ez)
+            return True
+
+        # Earlier dropped points: the direction must stay inside the cone of all of them
+        cone = self.intersect(self.cone, self.limit(ex, ey, ez))
+        if cone is None:
+            return False
+        ux, uy, uz, angle = cone
+        cx = uy * fz - uz * fy
+        cy = uz * fx - ux * fz
+        cz = ux * fy - uy * fx
+        if math.atan2(math.sqrt(cx * cx + cy * cy + cz * cz), ux * fx + uy * fy + uz * fz) > angle + self.ANGLE_EPSILON:
+            return False
+        self.cone = cone
+        return True
+
+    def flush(self):
+        if self.pending is not None:
+            x, y, z = self.pending
+            self.downstream(f"Z{x},{y},{z};")
+            self.moves_out += 1
+            self.anchor = self.pending
+            self.pending = None
+            self.cone = None
+
+
+# ==================== Device Streaming ====================
+
+class RMLStreamer:
+    """Text sink sending RML to a serial port or device file while it is being generated
+
+    write() hands data to a sender thread through a bounded buffer and
+    blocks while the buffer is full, so the conversion never runs more than
+    buffer_size bytes ahead of the machine. Flow control is left to the
+    serial driver: with 'hardware' (RTS/CTS) or 'software' (XON/XOFF) the
+    machine stops the sender, and through the full buffer the conversion.
+    pause() holds transmission until resume().
+    """
+
+    FLOW_CONTROLS = ('hardware', 'software', 'none')
+
+    def __init__(self, device, baudrate=9600, flow_control='hardware', buffer_size=4096, packet_size=256):
+        self.device = device
+        self.baudrate = baudrate
+        self.flow_control = flow_control
+        self.packet_size = packet_size
+        self.packets = queue.Queue(max(1, buffer_size // packet_size))
+        self.running = threading.Event()  # cleared while paused
+        self.running.set()
+        self.port = None
+        self.sender = None
+        self.error = None
+        self.sent = 0  # bytes written to the device
+
+    def open(self):
+        """Open and configure the device, then start the sender thread"""
+        if termios is None and serial is None:
+            # A port opened without termios could not be given a baud rate or flow control
+            raise ValueError("pySerial is required to stream on this platform")
+        if termios is None:
+            self.port = serial.Serial(self.device, self.baudrate, rtscts=self.flow_control == 'hardware',
+                                      xonxoff=self.flow_control == 'software')
+        else:
+            fd = os.open(self.device, os.O_WRONLY | getattr(os, 'O_NOCTTY', 0) | getattr(os, 'O_BINARY', 0))
+            if termios is not None and os.isatty(fd):
+                try:
+                    self.configure_tty(fd)
+                except termios.error as e:
+                    os.close(fd)
+                    raise OSError(f"Cannot configure {self.device}: {e}")
+                except ValueError:
+                    os.close(fd)
+                    raise
+            self.port = os.fdopen(fd, 'wb', buffering=0)
+        self.sender = threading.Thread(target=self.send, daemon=True)
+        self.sender.start()
+
+    def configure_tty(self, fd):
+        """Raw 8N1 at the configured baud rate with the configured flow control"""
+        speed = getattr(termios, f"B{self.baudrate}", None)
+        if speed is None:
+            raise ValueError(f"Unsupported baud rate: {self.baudrate}")
+        iflag, oflag, cflag, lflag, ispeed, ospeed, cc = termios.tcgetattr(fd)
+        crtscts = getattr(termios, 'CRTSCTS', 0)
+        iflag &= ~(termios.IXON | termios.IXOFF | termios.IXANY | termios.ICRNL | termios.INLCR |
+                   termios.IGNCR | termios.ISTRIP)
+        oflag &= ~termios.OPOST
+        lflag &= ~(termios.ICANON | termios.ECHO | termios.ECHOE | termios.ISIG | termios.IEXTEN)
+        cflag &= ~(termios.CSIZE | termios.PARENB | termios.CSTOPB | crtscts)
+        cflag |= termios.CS8 | termios.CREAD | termios.CLOCAL
+        if self.flow_control == 'hardware':
+            cflag |= crtscts
+        elif self.flow_control == 'software':
+            iflag |= termios.IXON | termios.IXOFF
+        termios.tcsetattr(fd, termios.TCSANOW, [iflag, oflag, cflag, lflag, speed, speed, cc])
+
+    def send(self):
+        """Sender thread: write queued packets to the device until the end marker"""
+        try:
+            while True:
+                packet = self.packets.get()
+                if packet is None:
+                    break
+                self.running.wait()
+                view = memoryview(packet)
+                while view:
+                    view = view[self.port.write(view) or 0:]
+                self.sent += len(packet)
+        except OSError as e:
+            self.error = e
+
+    def put(self, packet):
+        """Queue a packet, waiting for room but failing once the sender has failed"""
+        while True:
+            if self.error:
+                raise OSError(f"Device {self.device}: {self.error}")
+            try:
+                self.packets.put(packet, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, text):
+        data = text.encode('ascii')
+        for start in range(0, len(data), self.packet_size):
+            self.put(data[start:start + self.packet_size])
+        return len(text)
+
+    def pause(self):
+        self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    @property
+    def paused(self):
+        return not self.running.is_set()
+
+    def close(self, discard=False):
+        """Wait until everything queued is sent (or drop it with discard), then close the device"""
+        if self.sender is None:
+            return
+        try:
+            if discard:
+                while True:
+                    try:
+                        self.packets.get_nowait()
+                    except queue.Empty:
+                        break
+                self.running.set()
+                if not self.error:
+                    self.put(None)
+                self.sender.join(1.0)
+            else:
+                self.put(None)
+                self.sender.join()
+        finally:
+            self.sender = None
+            self.port.close()
+        if self.error and not discard:
+            raise OSError(f"Device {self.device}: {self.error}")
+
+
+# ==================== Conversion Cache ====================
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "gcode2rml")
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024  # bytes
+
+
+class ConversionCache:
+    """On-disk cache of RML results keyed by input content, settings and converter version
+
+    Entries are evicted least recently used first once the cache grows past
+    max_size; a hit refreshes the entry's modification time.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_size=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, input_file_path, settings):
+        digest = hashlib.sha256()
+        digest.update(CONVERTER_VERSION.encode())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        with open(input_file_path, 'rb') as f:
+            for block in iter(functools.partial(f.read, 1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + ".rml")
+
+    def get(self, key, output_file_path):
+        """Copy a cached result to output_file_path, returning whether it was found"""
+        entry = self.entry_path(key)
+        if not os.path.exists(entry):
+            return False
+        temp_path = temp_file_for(output_file_path)
+        try:
+            shutil.copyfile(entry, temp_path)
+            os.utime(entry)
+            os.replace(temp_path, output_file_path)
+        except FileNotFoundError:  # evicted meanwhile
+            return False
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return True
+
+    def put(self, key, rml_file_path):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = temp_file_for(self.entry_path(key))
+        try:
+            shutil.copyfile(rml_file_path, temp_path)
+            os.replace(temp_path, self.entry_path(key))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict()
+
+    def entries(self):
+        """(mtime, size, path) of every cache entry, oldest first"""
+        result = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return result
+        for name in names:
+            if not name.endswith(".rml"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            result.append((stat.st_mtime, stat.st_size, path))
+        result.sort()
+        return result
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# ==================== Compiled Program ====================
+
+IR_EXTENSION = ".rmlir"
+
+# Record kinds besides motion modes (0, 1, 2, 3, 28): output commands
+IR_COMMANDS = {
+    90: "^PA;",
+    91: "^PR;",
+    103: "!RC15;!MC1;",
+    105: "!MC0;",
+}
+IR_COMMAND_KINDS = {command: kind for kind, command in IR_COMMANDS.items()}
+
+
+class CompiledProgram:
+    """Array-backed intermediate representation of a parsed G-code program
+
+    Holds one record per motion block (mode, plane, absolute target, arc
+    centre offset and feed) or output command, in program order. It does not
+    depend on the settings, so it can be re-emitted as RML with different
+    offsets or arc resolution without parsing the G-code again.
+    """
+
+    MAGIC = b"G2RMLIR1"
+
+    def __init__(self):
+        self.kinds = array.array('h')
+        self.planes = array.array('b')
+        self.targets = array.array('d')
+        self.centers = array.array('d')
+        self.feeds = array.array('d')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __iter__(self):
+        targets = self.targets
+        centers = self.centers
+        for index, kind in enumerate(self.kinds):
+            offset = index * 3
+            yield (kind, self.planes[index], targets[offset:offset + 3], centers[offset:offset + 3],
+                   self.feeds[index])
+
+    def append_motion(self, mode, plane, target, center, feed):
+        self.kinds.append(mode)
+        self.planes.append(plane)
+        self.targets.extend((target.x, target.y, target.z))
+        self.centers.extend((center.x, center.y, center.z))
+        self.feeds.append(feed)
+
+    def append_command(self, command):
+        self.kinds.append(IR_COMMAND_KINDS[command])
+        self.planes.append(0)
+        self.targets.extend((0.0, 0.0, 0.0))
+        self.centers.extend((0.0, 0.0, 0.0))
+        self.feeds.append(0.0)
+
+    def append_record(self, kind, plane, target, center, feed):
+        """Append a record as yielded by iteration"""
+        self.kinds.append(kind)
+        self.planes.append(plane)
+        self.targets.extend(target)
+        self.centers.extend(center)
+        self.feeds.append(feed)
+
+    def columns(self):
+        return (self.kinds, self.planes, self.targets, self.centers, self.feeds)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(struct.pack('<I', len(self)))
+            for column in self.columns():
+                if sys.byteorder == 'big':
+                    column = array.array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        program = cls()
+        with open(path, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not a compiled G-code program")
+            count, = struct.unpack('<I', f.read(4))
+            for column, length in zip(program.columns(), (count, count, count * 3, count * 3, count)):
+                column.fromfile(f, length)
+                if sys.byteorder == 'big':
+                    column.byteswap()
+        return program
+
+
+# ==================== Rapid Optimization ====================
+
+class CutSegment:
+    """Motion records from leaving safe Z to the retract back to it, with the travel before them"""
+
+    def __init__(self, travels, body, entry):
+        self.travels = travels  # rapids at safe Z leading to the entry point
+        self.body = body
+        self.entry = entry  # where the tool leaves safe Z
+        self.exit = tuple(body[-1][2])  # where the retract ends
+
+
+class PointGrid:
+    """Bucket grid over the XY of 3D points, for nearest point queries by 3D distance
+
+    Cells are sized for about one point each; a query searches rings of
+    cells outwards until no unsearched cell can hold a closer point.
+    """
+
+    def __init__(self, points):
+        self.points = points
+        xs = [point[0] for point in points]
+        ys = [point[1] for point in points]
+        self.min_x = min(xs)
+        self.min_y = min(ys)
+        extent = max(max(xs) - self.min_x, max(ys) - self.min_y)
+        self.cell = extent / math.sqrt(len(points)) or 1.0
+        self.size = int(extent / self.cell) + 1  # cells per side
+        self.cells = {}
+        for index, point in enumerate(points):
+            self.cells.setdefault(self.key(point), []).append(index)
+
+    def key(self, point):
+        return int((point[0] - self.min_x) // self.cell), int((point[1] - self.min_y) // self.cell)
+
+    def remove(self, index):
+        key = self.key(self.points[index])
+        bucket = self.cells[key]
+        bucket.remove(index)
+        if not bucket:
+            del self.cells[key]
+
+    def ring(self, cx, cy, ring):
+        """Keys of the cells at Chebyshev distance ring from (cx, cy) inside the grid"""
+        last = self.size - 1
+        x0, x1 = max(cx - ring, 0), min(cx + ring, last)
+        y0, y1 = max(cy - ring + 1, 0), min(cy + ring - 1, last)
+        keys = []
+        if 0 <= cy - ring <= last:
+            keys.extend((x, cy - ring) for x in range(x0, x1 + 1))
+        if ring and 0 <= cy + ring <= last:
+            keys.extend((x, cy + ring) for x in range(x0, x1 + 1))
+        if ring and 0 <= cx - ring <= last:
+            keys.extend((cx - ring, y) for y in range(y0, y1 + 1))
+        if ring and 0 <= cx + ring <= last:
+            keys.extend((cx + ring, y) for y in range(y0, y1 + 1))
+        return keys
+
+    def nearest(self, point, count=1):
+        """Indices of the count nearest points, closest first, the lowest index first among equals"""
+        cells = self.cells
+        points = self.points
+        distance = math.dist
+        cx, cy = self.key(point)
+        last = self.size - 1
+        ring = max(0, -cx, cx - last, -cy, cy - last)  # the first ring reaching into the grid
+        last_ring = max(cx, last - cx, cy, last - cy)
+        found = []
+        while ring <= last_ring:
+            for key in self.ring(cx, cy, ring):
+                for index in cells.get(key, ()):
+                    found.append((distance(point, points[index]), index))
+            if len(found) >= count:
+                found.sort()
+                del found[count:]
+                # Points beyond this ring are further than ring cells away
+                if found[-1][0] <= ring * self.cell:
+                    break
+            ring += 1
+        found.sort()
+        return [index for _, index in found]
+
+
+class RapidOptimizer:
+    """Reorders the cut segments of a CompiledProgram to shorten rapid travel
+
+    A cut segment runs from where the tool leaves safe Z to the retract that
+    brings it back; the rapids at safe Z between segments are travel and are
+    replaced by one direct rapid to the next segment. Output commands, G28
+    and segments containing them stay in place and split the program into
+    groups that are reordered independently, so spindle and mode commands
+    keep applying to the same cuts. Segments are ordered nearest neighbour
+    first, then improved with 2-opt. Both look up nearby entry points in a
+    PointGrid, so long jobs are ordered in about linear time.
+    """
+
+    TWO_OPT_WINDOW = 256  # furthest position a segment is swapped with
+    TWO_OPT_NEIGHBOURS = 12  # nearest entries tried as the next segment of each exit
+    TWO_OPT_PASSES = 20
+
+    def __init__(self, safe_z=None):
+        self.safe_z = safe_z  # None: most common rapid height of the program
+        self.segments = 0
+        self.groups = 0
+        self.travel_before = 0.0  # mm
+        self.travel_after = 0.0
+
+    distance = staticmethod(math.dist)
+
+    def detect_safe_z(self, records):
+        heights = {}
+        for kind, _, target, _, _ in records:
+            if kind == 0:
+                heights[target[2]] = heights.get(target[2], 0) + 1
+        if not heights:
+            return None
+        return max(heights, key=lambda z: (heights[z], z))
+
+    def split(self, records, safe_z):
+        """Program items in order: lists of fixed records and CutSegments"""
+        items = []
+        fixed = []
+        travels = []
+        body = None
+        entry = None  # position the current segment starts from
+        movable = True
+        up = False  # tool known to be at safe Z
+        position = None
+        for record in records:
+            kind, _, target, _, _ = record
+            if body is not None:
+                body.append(record)
+                if kind in IR_COMMANDS or kind == 28:
+                    movable = False
+                elif target[2] >= safe_z:
+                    # Retracted: the segment is complete
+                    if movable:
+                        if fixed:
+                            items.append(fixed)
+                            fixed = []
+                        self.add_segment(items, travels, body, entry)
+                    else:
+                        fixed.extend(travels)
+                        fixed.extend(body)
+                    travels = []
+                    body = None
+                    up = True
+                    position = tuple(target)
+                continue
+
+            if kind in IR_COMMANDS or kind == 28:
+                fixed.extend(travels)
+                travels = []
+                fixed.append(record)
+                if kind == 28:
+                    up = False
+                    position = None
+                continue
+            if not up:
+                fixed.append(record)
+                up = target[2] >= safe_z
+                position = tuple(target)
+            elif kind == 0 and target[2] >= safe_z:
+                travels.append(record)
+                position = tuple(target)
+            else:
+                # The tool leaves safe Z: a segment starts
+                entry = position
+                body = []
+                movable = True
+                if target[2] >= safe_z:
+                    # A single move at safe height is a segment of its own
+                    if fixed:
+                        items.append(fixed)
+                        fixed = []
+                    self.add_segment(items, travels, [record], entry)
+                    travels = []
+                    body = None
+                    position = tuple(target)
+                else:
+                    body.append(record)
+
+        fixed.extend(travels)
+        if body is not None:
+            fixed.extend(body)
+        if fixed:
+            items.append(fixed)
+        return items
+
+    @staticmethod
+    def add_segment(items, travels, body, entry):
+        last = items[-1] if items else None
+        if not travels and isinstance(last, CutSegment) and last.exit == entry:
+            # No travel since the last retract: the cut continues
+            last.body.extend(body)
+            last.exit = tuple(body[-1][2])
+        else:
+            items.append(CutSegment(travels, body, entry))
+
+    def path_cost(self, start, order):
+        cost = 0.0
+        position = start
+        for segment in order:
+            cost += self.distance(position, segment.entry)
+            position = segment.exit
+        return cost
+
+    def order(self, start, segments):
+        """Segments in a short travel order from start: nearest neighbour, then 2-opt"""
+        grid = PointGrid([segment.entry for segment in segments])
+        order = []
+        position = start
+        for _ in segments:
+            index = grid.nearest(position)[0]
+            grid.remove(index)
+            order.append(index)
+            position = segments[index].exit
+        order = [segments[index] for index in self.two_opt(start, segments, order)]
+        if self.path_cost(start, order) < self.path_cost(start, segments):
+            return order
+        return list(segments)
+
+    def two_opt(self, start, segments, order):
+        """Reverse runs of segments while that shortens the travel (segments keep their direction)
+
+        order holds indices into segments. A run is only reversed when one of
+        the two exits it reconnects is then followed by one of its
+        TWO_OPT_NEIGHBOURS nearest entries.
+        """
+        distance = self.distance
+        count = len(order)
+        grid = PointGrid([segment.entry for segment in segments])
+        start_neighbours = grid.nearest(start, self.TWO_OPT_NEIGHBOURS)
+        neighbours = [grid.nearest(segment.exit, self.TWO_OPT_NEIGHBOURS) for segment in segments]
+
+        # Exit and entry at each position, 0 being the start, and the position of each segment
+        exits = [start] + [segments[index].exit for index in order]
+        entries = [None] + [segments[index].entry for index in order]
+        positions = [0] * count
+        for k, index in enumerate(order, 1):
+            positions[index] = k
+
+        # Travel forward (k -> k+1) and backward (k+1 -> k) summed up to each position
+        forward = [0.0] * (count + 1)
+        backward = [0.0] * (count + 1)
+
+        def update(first, last):
+            """Sum the travel between positions first..last again, shifting the sums after them"""
+            old_forward, old_backward = forward[last], backward[last]
+            for k in range(first, last):
+                forward[k + 1] = forward[k] + distance(exits[k], entries[k + 1])
+                if k:
+                    backward[k + 1] = backward[k] + distance(exits[k + 1], entries[k])
+            shift_forward = forward[last] - old_forward
+            shift_backward = backward[last] - old_backward
+            for k in range(last + 1, count + 1):
+                forward[k] += shift_forward
+                backward[k] += shift_backward
+
+        update(0, count)
+        for _ in range(self.TWO_OPT_PASSES):
+            improved = False
+            for i in range(count - 1):
+                # Segments whose entry is near the exit at i (to be j) or at i+1 (to be j+1)
+                candidates = [positions[index] for index in (neighbours[order[i - 1]] if i else start_neighbours)]
+                candidates.extend(positions[index] - 1 for index in neighbours[order[i]])
+                for j in candidates:
+                    if j < i + 2 or j > i + self.TWO_OPT_WINDOW:
+                        continue
+                    # Reversing positions i+1 .. j, so that j follows i
+                    old = forward[j] - forward[i]
+                    new = distance(exits[i], entries[j]) + backward[j] - backward[i + 1]
+                    if j < count:
+                        old += forward[j + 1] - forward[j]
+                        new += distance(exits[i + 1], entries[j + 1])
+                    if new < old - 1e-9:
+                        order[i:j] = order[i:j][::-1]
+                        exits[i + 1:j + 1] = exits[i + 1:j + 1][::-1]
+                        entries[i + 1:j + 1] = entries[i + 1:j + 1][::-1]
+                        for k in range(i + 1, j + 1):
+                            positions[order[k - 1]] = k
+                        update(i, min(j + 1, count))
+                        improved = True
+            if not improved:
+                break
+        return order
+
+    def optimize(self, program):
+        """A reordered copy of program"""
+        records = list(program)
+        safe_z = self.safe_z if self.safe_z is not None else self.detect_safe_z(records)
+        if safe_z is None:
+            return program
+        optimized = CompiledProgram()
+
+        position = None
+        group = []
+        for item in self.split(records, safe_z) + [[]]:
+            if isinstance(item, CutSegment):
+                if not group:
+                    group_start = position
+                group.append(item)
+                position = item.exit
+                continue
+
+            if group:
+                position = self.emit_group(optimized, group_start, group)
+                group = []
+            for record in item:
+                optimized.append_record(*record)
+                if record[0] not in IR_COMMANDS:
+                    position = tuple(record[2]) if record[0] != 28 else None
+        return optimized
+
+    def emit_group(self, program, start, group):
+        """Append the group in its optimized order, returning the final position"""
+        self.groups += 1
+        self.segments += len(group)
+        position = start
+        for segment in group:
+            for record in segment.travels:
+                self.travel_before += self.distance(position, record[2])
+                position = tuple(record[2])
+            position = segment.exit
+
+        for segment in self.order(start, group):
+            if segment.entry != start:
+                # One direct rapid at safe Z to the entry point
+                self.travel_after += self.distance(start, segment.entry)
+                plane, feed = segment.body[0][1], segment.body[0][4]
+                program.append_record(0, plane, segment.entry, (0.0, 0.0, 0.0), feed)
+            start = segment.exit
+            for record in segment.body:
+                program.append_record(*record)
+        return start
+
+
+# ==================== G-code Input ====================
+
+def map_input(input_file_path):
+    """Open an input file as a read-only memory map (empty files as a plain binary file)"""
+    input_file = open(input_file_path, 'rb')
+    if os.fstat(input_file.fileno()).st_size == 0:
+        return input_file
+    with input_file:
+        return mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def input_size(input_file):
+    """Size in bytes of a mapped or open binary input"""
+    if isinstance(input_file, mmap.mmap):
+        return len(input_file)
+    return os.fstat(input_file.fileno()).st_size
+
+
+# ==================== G-code Tokenizer ====================
+
+# Comment delimiters: parentheses and ';' (comment to the end of the line)
+COMMENT_DELIMITERS = re.compile(r'[();]')
+
+# Address letter and its value; a lowercase 'e' after a digit is an exponent
+WORD_PATTERN = re.compile(r'([A-Za-z])((?:[^A-Za-z;]|(?<=[0-9.])e(?=[-+]?[0-9]))*)')
+
+# Faster pattern for the usual case of a line without lowercase letters
+UPPERCASE_WORD_PATTERN = re.compile(r'([A-Z])([^A-Z]*)')
+
+
+# ==================== Arc Tables ====================
+
+# Arcs with fewer steps than this are cheaper to tessellate in the Python loop
+ARC_BATCH_MIN_STEPS = 8
+
+# Lower bound for chord-tolerance segmentation (divisions per revolution)
+MIN_ARC_RESOLUTION = 4
+
+def arc_steps(full_angle, divisions, steps):
+    """Step angles full_angle * step / divisions and their sin/cos values
+
+    Values are computed with the math module so the NumPy engine matches the
+    pure-Python loop bit for bit.
+    """
+    theta = [full_angle * step / divisions for step in range(steps)]
+    return (
+        np.array(theta),
+        np.array([math.cos(t) for t in theta]),
+        np.array([math.sin(t) for t in theta]),
+        np.array([math.cos(-t) for t in theta]),
+        np.array([math.sin(-t) for t in theta]),
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def arc_table(circular_resolution):
+    """Cached arc_steps() for one circular resolution, covering a full revolution"""
+    return arc_steps(2 * math.pi, circular_resolution, int(math.ceil(circular_resolution)) + 1)
+
+
+def chord_resolution(radius, tolerance):
+    """Divisions per revolution keeping the chord deviation of an arc within tolerance"""
+    if radius <= tolerance:
+        return MIN_ARC_RESOLUTION
+    # Sagitta of a chord spanning angle a: radius * (1 - cos(a / 2))
+    max_step = 2 * math.acos(1 - tolerance / radius)
+    return max(MIN_ARC_RESOLUTION, math.ceil(2 * math.pi / max_step))
+
+
+# ==================== Conversion Statistics ====================
+
+class ConversionStats:
+    """Per-stage timers and input counters of one conversion
+
+    Stage times are exclusive: time spent in a nested stage (e.g. writing
+    from inside arc tessellation) only counts for the inner stage. Time
+    outside every stage is reported as "other".
+    """
+
+    STAGES = ('read', 'strip', 'tokenize', 'dispatch', 'arc', 'format', 'write', 'other')
+    MOTION_CODES = {0: "G00", 1: "G01", 2: "G02", 3: "G03", 28: "G28"}
+
+    def __init__(self):
+        self.times = dict.fromkeys(self.STAGES, 0.0)
+        self.stack = ['other']
+        self.started = self.mark = time.perf_counter()
+        self.elapsed = 0.0
+        self.lines = 0
+        self.words = 0
+        self.blocks = dict.fromkeys(self.MOTION_CODES.values(), 0)
+        self.arc_segments = 0
+        self.v_changes = 0
+        self.unknown_codes = {}
+
+    def enter(self, stage):
+        now = time.perf_counter()
+        self.times[self.stack[-1]] += now - self.mark
+        self.stack.append(stage)
+        self.mark = now
+
+    def leave(self):
+        now = time.perf_counter()
+        self.times[self.stack.pop()] += now - self.mark
+        self.mark = now
+
+    def wrap(self, function, stage):
+        """function, timed as stage"""
+        enter = self.enter
+        leave = self.leave
+
+        def timed(*args):
+            enter(stage)
+            try:
+                return function(*args)
+            finally:
+                leave()
+        return timed
+
+    def iterate(self, iterable, stage):
+        """Items of iterable, the time spent producing them timed as stage"""
+        iterator = iter(iterable)
+        while True:
+            self.enter(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.leave()
+            yield item
+
+    def merge(self, other):
+        """Add the timers and counters of another part of the same conversion"""
+        for stage, seconds in other.times.items():
+            self.times[stage] += seconds
+        for code, count in other.blocks.items():
+            self.blocks[code] += count
+        self.words += other.words
+        self.v_changes += other.v_changes
+
+    def finish(self, converter):
+        """Stop the clock and take the totals the converter keeps itself"""
+        now = time.perf_counter()
+        self.times[self.stack[-1]] += now - self.mark
+        self.mark = now
+        self.elapsed = now - self.started
+        self.lines = converter.lines_read
+        self.arc_segments = converter.arc_segments
+        self.unknown_codes = dict(converter.unsupported_codes)
+
+    def as_dict(self):
+        return {
+            "elapsed_s": self.elapsed,
+            "stage_s": dict(self.times),
+            "lines": self.lines,
+            "words": self.words,
+            "blocks": dict(self.blocks),
+            "arc_segments": self.arc_segments,
+            "v_changes": self.v_changes,
+            "unknown_codes": dict(self.unknown_codes),
+        }
+
+    def report(self):
+        """Multi-line text summary for the log"""
+        total = sum(self.times.values()) or 1.0
+        stages = ", ".join(f"{stage} {seconds:.3f}s ({seconds / total:.0%})"
+                           for stage, seconds in self.times.items() if seconds)
+        blocks = ", ".join(f"{code} x{count}" for code, count in self.blocks.items())
+        lines = [
+            f"Time: {self.elapsed:.3f}s ({self.lines / (self.elapsed or 1.0):.0f} lines/s)",
+            f"Stages: {stages}",
+            f"Lines: {self.lines}, words: {self.words}, arc segments: {self.arc_segments}, "
+            f"V changes: {self.v_changes}",
+            f"Blocks: {blocks}",
+        ]
+        if self.unknown_codes:
+            lines.append("Unknown codes: " + ", ".join(f"{code} x{count}"
+                                                        for code, count in sorted(self.unknown_codes.items())))
+        return "\n".join(lines)
+
+
+# ==================== G-code to RML-1 Converter ====================
+
+class GCode2RMLConverter:
+    def __init__(self):
+        # Imported settings
+        self.home_position = Vector(0.0, 0.0, 0.0)
+        self.pos_offset = Vector(0.0, 0.0, 0.0)
+        self.output_offset = (0.0, 0.0, 0.0)
+        self.rapid_feed_speed = 1000.0
+        self.circular_resolution = 360.0
+        self.arc_chord_tolerance = 0.0  # mm, 0: fixed circular_resolution
+        self.compact_moves = False  # drop duplicate and collinear moves
+        self.compact_tolerance = 0.0  # mm
+        self.fixed_point = False  # exact integer coordinates instead of floats
+        self.optimize_rapids = False  # reorder cut segments to shorten rapid travel
+        self.safe_z = None  # rapid height separating cut segments, None: detect
+        self.acceleration = 0.0  # mm/s² for time estimates, 0: moves at constant feed
+        self.work_area = None  # (x, y, z) mm checked by estimates, 0: axis not checked
+
+        # Attribute values applied on top of the settings file (e.g. from the command line)
+        self.overrides = {}
+
+        # ConversionCache for finished results, None: always convert
+        self.cache = None
+
+        # CompiledProgram receiving motion blocks while compiling, None: execute them
+        self.program = None
+
+        # Only track the state left by motion blocks (pre-scan for chunked conversion)
+        self.scan_only = False
+
+        # Per-stage timers and counters, a fresh ConversionStats per conversion when enabled
+        self.collect_stats = False
+        self.stats = None
+
+        # ToolpathPreview fed with every generated move, None: no preview
+        self.preview = None
+
+        # Machining time and envelope, a fresh JobEstimate per conversion when enabled
+        self.collect_estimate = False
+        self.estimate = None
+
+        # Arc tessellation engine: 'numpy' (batched) or 'python' (per-step loop)
+        self.arc_engine = 'numpy' if np is not None else 'python'
+
+        # Processing state
+        self.abs_inc = 90  # 90: abs / 91: inc
+        self.mm_in = 21  # 20: inches / 21: millimeters
+        self.mov_mode = 0  # 0: rapid / 1: linear / 2: CW circle / 3: CCW circle / 28: return home
+        self.plane_select = 17  # 17: XY / 18: XZ / 19: YZ
+        self.TLOC_mode = 49  # 43: positive / 44: negative / 49: canceled
+        self.TROC_mode = 40  # 40: canceled / 41: left / 42: right
+        self.feed_mode = 94  # 94: per min / 95: per rev
+        self.coor_sys = 1
+
+        self.next_pos = Vector(0, 0, 0)
+        self.center_pos_inc = Vector(0, 0, 0)
+        self.current_pos = Vector(0, 0, 0)
+
+        self.feed_speed = 0
+        self.last_feed_speed = None  # speed of the last V command
+        self.spindle_speed = 0
+        self.spindle_state = 0  # 0: stop / 1: CW / -1: CCW
+        self.program_number = 0
+        self.next_tool_num = 0
+        self.TROC_tool_num = 0
+        self.TLOC_tool_num = 0
+        self.dwell_enable = 0
+        self.coor_changed = 0
+
+        # Statistics: arc segments emitted, and what a fixed resolution would have emitted
+        self.arc_segments = 0
+        self.arc_segments_fixed = 0
+        self.unsupported_codes = {}  # code -> number of ignored words
+
+        # Word dispatch tables
+        self.build_dispatch_tables()
+
+        # Output sink: every RML command is passed to self.emit
+        self.output_lines = []
+        self.emit = self.output_lines.append
+
+        self.callback_progress = None
+        self.callback_log = None
+        self.progress_step = 0.0  # minimum progress change (%) between callbacks
+        self.lines_read = 0
+        self.comment_mode = False  # inside a parenthesised comment spanning lines
+        self.input_end = None  # stop reading at this input offset, None: end of file
+
+        # Incremental reconversion: modal-state checkpoints taken while reading
+        self.incremental = False
+        self.checkpoint_interval = 1024 * 1024  # bytes of input between checkpoints
+        self.checkpoints = None
+        self.checkpoint_digest = None
+        self.writer = None
+        self.compactor = None
+
+    def log(self, message):
+        if self.callback_log:
+            self.callback_log(message)
+
+    def import_settings(self, setting_file_path):
+        """Import settings from setting.txt file"""
+        try:
+            with open(setting_file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+
+                    if '=' in line:
+                        key, value = line.split('=', 1)
+                        key = key.strip()
+                        value = value.strip().rstrip(';').strip()
+
+                        if key == "homePosition":
+                            # Remove parentheses and spaces
+                            value = value.replace('(', '').replace(')', '').replace(' ', '')
+                            coords = value.split(',')
+                            if len(coords) == 3:
+                                self.home_position = Vector(float(coords[0]), float(coords[1]), float(coords[2]))
+                        elif key == "posOffset":
+                            value = value.replace('(', '').replace(')', '').replace(' ', '')
+                            coords = value.split(',')
+                            if len(coords) == 3:
+                                self.pos_offset = Vector(float(coords[0]), float(coords[1]), float(coords[2]))
+                        elif key == "rapidFeedSpeed":
+                            self.rapid_feed_speed = float(value)
+                        elif key == "circularResolution":
+                            self.circular_resolution = float(value)
+                        elif key == "arcChordTolerance":
+                            self.arc_chord_tolerance = float(value)
+                        elif key == "compactMoves":
+                            self.compact_moves = float(value) != 0
+                        elif key == "compactTolerance":
+                            self.compact_tolerance = float(value)
+                        elif key == "fixedPoint":
+                            self.fixed_point = float(value) != 0
+                        elif key == "optimizeRapids":
+                            self.optimize_rapids = float(value) != 0
+                        elif key == "safeZ":
+                            self.safe_z = None if value.lower() == "auto" else float(value)
+                        elif key == "acceleration":
+                            self.acceleration = float(value)
+                        elif key == "workArea":
+                            value = value.replace('(', '').replace(')', '').replace(' ', '')
+                            coords = value.split(',')
+                            if len(coords) == 3:
+                                self.work_area = (float(coords[0]), float(coords[1]), float(coords[2]))
+        except Exception as e:
+            self.log(f"Error reading settings: {e}")
+        self.prepare_output()
+
+    def effective_settings(self):
+        """Settings that affect the generated RML"""
+        return {
+            "homePosition": [self.home_position.x, self.home_position.y, self.home_position.z],
+            "posOffset": [self.pos_offset.x, self.pos_offset.y, self.pos_offset.z],
+            "rapidFeedSpeed": self.rapid_feed_speed,
+            "circularResolution": self.circular_resolution,
+            "arcChordTolerance": self.arc_chord_tolerance,
+            "compactMoves": self.compact_moves,
+            "compactTolerance": self.compact_tolerance,
+            "fixedPoint": self.fixed_point,
+            "optimizeRapids": self.optimize_rapids,
+            "safeZ": self.safe_z,
+        }
+
+    def plane_conv(self, vect, plane):
+        """Coordinate transformation for selected plane"""
+        if plane == 17:  # XY plane
+            return Vector(vect.x, vect.y, vect.z)
+        elif plane == 18:  # XZ plane
+            return Vector(vect.z, vect.x, vect.y)
+        elif plane == 19:  # YZ plane
+            return Vector(vect.y, vect.z, vect.x)
+        return vect
+
+    def plane_conv_inv(self, vect, plane):
+        """Inverse coordinate transformation"""
+        if plane == 17:  # XY plane
+            return Vector(vect.x, vect.y, vect.z)
+        elif plane == 18:  # XZ plane
+            return Vector(vect.y, vect.z, vect.x)
+        elif plane == 19:  # YZ plane
+            return Vector(vect.z, vect.x, vect.y)
+        return vect
+
+    def prepare_output(self):
+        """Precompute the output offset components used by every move and select the coordinate words"""
+        self.output_offset = (self.pos_offset.x, self.pos_offset.y, self.pos_offset.z)
+        self.fixed_offset = tuple(round(value * FIXED_SCALE) for value in self.output_offset)
+        handlers = self.address_handlers
+        if self.fixed_point:
+            handlers['X'], handlers['Y'], handlers['Z'] = self.set_x_fixed, self.set_y_fixed, self.set_z_fixed
+        else:
+            handlers['X'], handlers['Y'], handlers['Z'] = self.set_x, self.set_y, self.set_z
+
+    def move(self, next_pos, feed_speed):
+        """Generate movement command"""
+        if self.fixed_point:
+            # next_pos holds exact images of fixed-point values: offset them and round to the
+            # nearest RML unit, halves away from zero, in integer arithmetic
+            offset_x, offset_y, offset_z = self.fixed_offset
+            x = round(next_pos.x * FIXED_SCALE) + offset_x
+            y = round(next_pos.y * FIXED_SCALE) + offset_y
+            z = round(next_pos.z * FIXED_SCALE) + offset_z
+            self.emit_move((x + RML_HALF_STEP) // RML_STEP if x >= 0 else -((RML_HALF_STEP - x) // RML_STEP),
+                           (y + RML_HALF_STEP) // RML_STEP if y >= 0 else -((RML_HALF_STEP - y) // RML_STEP),
+                           (z + RML_HALF_STEP) // RML_STEP if z >= 0 else -((RML_HALF_STEP - z) // RML_STEP),
+                           feed_speed)
+        else:
+            self.move_to(next_pos.x, next_pos.y, next_pos.z, feed_speed)
+
+        # Update current position
+        self.current_pos = next_pos
+
+    def move_to(self, x, y, z, feed_speed):
+        """Generate movement command from plain coordinates, without intermediate vectors"""
+        # Scaling and offset, then format coordinates as integers
+        offset_x, offset_y, offset_z = self.output_offset
+        if self.fixed_point:
+            # Arc points: nearest unit, halves away from zero
+            x = (x + offset_x) * 100.0
+            y = (y + offset_y) * 100.0
+            z = (z + offset_z) * 100.0
+            self.emit_move(int(x + 0.5 if x >= 0 else x - 0.5),
+                           int(y + 0.5 if y >= 0 else y - 0.5),
+                           int(z + 0.5 if z >= 0 else z - 0.5),
+                           feed_speed)
+            return
+        self.emit_move(int((x + offset_x) * 100.0 + 0.5),
+                       int((y + offset_y) * 100.0 + 0.5),
+                       int((z + offset_z) * 100.0 + 0.5),
+                       feed_speed)
+
+    def emit_move(self, x, y, z, feed_speed):
+        """Emit a movement command in RML units (0.01 mm)"""
+        # Add speed command if changed
+        if feed_speed != self.last_feed_speed:
+            self.emit(f"V{feed_speed / 60:.1f};")
+            self.last_feed_speed = feed_speed
+
+        # Movement command
+        self.emit(f"Z{x},{y},{z};")
+
+    def rapid_positioning(self, next_pos):
+        """Handle G00 - rapid positioning"""
+        self.move(next_pos, self.rapid_feed_speed)
+
+    def linear_interpolation(self, next_pos, feed_speed):
+        """Handle G01 - linear interpolation"""
+        self.move(next_pos, feed_speed)
+
+    def arc_geometry(self, next_pos, center_pos_inc, plane_select):
+        """Arc start, centre, sweep angle and step count in the selected plane"""
+        mid_current_pos = self.plane_conv(self.current_pos, plane_select)
+        mid_next_pos = self.plane_conv(next_pos, plane_select)
+        mid_center_pos_inc = self.plane_conv(center_pos_inc, plane_select)
+        mid_center_pos = self.current_pos.add(mid_center_pos_inc)
+
+        mid_start_pos = mid_current_pos
+        mid_delta1 = mid_current_pos.sub(mid_center_pos)
+        mid_delta2 = mid_next_pos.sub(mid_center_pos)
+
+        # Zero Z for calculations in the plane
+        mid_delta1.z = 0.0
+        mid_delta2.z = 0.0
+
+        # Calculate angle
+        delta_angle = math.acos(mid_delta1.dot(mid_delta2) / (mid_delta2.size() * mid_delta1.size()))
+        if delta_angle <= 0:
+            delta_angle += 2 * math.pi
+
+        # Number of steps, step angle full_angle / divisions
+        if self.arc_chord_tolerance > 0:
+            # Equal steps, rounded up so every chord (the last one too) stays within the tolerance
+            resolution = chord_resolution(mid_delta1.size(), self.arc_chord_tolerance)
+            delta_steps = max(1, math.ceil(resolution * delta_angle / (2 * math.pi)))
+            full_angle, divisions = delta_angle, delta_steps
+        else:
+            delta_steps = int(self.circular_resolution * delta_angle / (2 * math.pi))
+            full_angle, divisions = 2 * math.pi, self.circular_resolution
+
+        return (mid_delta1, mid_center_pos, mid_start_pos, mid_next_pos,
+                delta_angle, full_angle, divisions, delta_steps)
+
+    def circular_interpolation(self, next_pos, center_pos_inc, plane_select, direction, feed_speed):
+        """Handle G02/G03 - circular interpolation"""
+        (mid_delta1, mid_center_pos, mid_start_pos, mid_next_pos,
+         delta_angle, full_angle, divisions, delta_steps) = self.arc_geometry(next_pos, center_pos_inc, plane_select)
+
+        if self.arc_chord_tolerance > 0:
+            self.arc_segments_fixed += int(self.circular_resolution * delta_angle / (2 * math.pi)) + 1
+        self.arc_segments += delta_steps + 1
+
+        if self.arc_engine == 'numpy' and delta_steps >= ARC_BATCH_MIN_STEPS:
+            self.circular_interpolation_numpy(mid_delta1, mid_center_pos, mid_start_pos, mid_next_pos,
+                                              delta_angle, delta_steps, full_angle, divisions, plane_select, direction,
+                                              feed_speed)
+            self.move(next_pos, feed_speed)
+            return
+
+        for step in range(delta_steps):
+            theta_temp = full_angle * step / divisions
+            if direction == 2:  # Clockwise
+                theta_temp *= -1
+
+            # Calculate intermediate point
+            pos_x = (mid_delta1.x * math.cos(theta_temp) +
+                     mid_delta1.y * math.sin(-theta_temp) +
+                     mid_center_pos.x)
+            pos_y = (mid_delta1.x * math.sin(theta_temp) +
+                     mid_delta1.y * math.cos(theta_temp) +
+                     mid_center_pos.y)
+            pos_z = ((mid_next_pos.z - mid_start_pos.z) *
+                     (theta_temp / delta_angle) + mid_start_pos.z)
+
+            # Transform back and move
+            if plane_select == 18:  # XZ plane
+                self.move_to(pos_y, pos_z, pos_x, feed_speed)
+            elif plane_select == 19:  # YZ plane
+                self.move_to(pos_z, pos_x, pos_y, feed_speed)
+            else:
+                self.move_to(pos_x, pos_y, pos_z, feed_speed)
+
+        # Final move to end point
+        self.move(next_pos, feed_speed)
+        self.current_pos = next_pos
+
+    def circular_interpolation_numpy(self, mid_delta1, mid_center_pos, mid_start_pos, mid_next_pos,
+                                     delta_angle, delta_steps, full_angle, divisions, plane_select, direction,
+                                     feed_speed):
+        """Emit all intermediate arc points in one batched NumPy operation
+
+        Uses the same operation order as the loop in circular_interpolation
+        and a math-computed sin/cos table, so the output is byte-identical.
+        """
+        if self.arc_chord_tolerance > 0:  # equal steps over this arc only
+            table = arc_steps(full_angle, divisions, delta_steps)
+        else:
+            table = arc_table(divisions)
+        theta, cos_pos, sin_pos, cos_neg, sin_neg = table
+        theta = theta[:delta_steps]
+        if direction == 2:  # Clockwise
+            theta = -theta
+            cos_t, sin_t, sin_neg_t = cos_neg[:delta_steps], sin_neg[:delta_steps], sin_pos[:delta_steps]
+        else:
+            cos_t, sin_t, sin_neg_t = cos_pos[:delta_steps], sin_pos[:delta_steps], sin_neg[:delta_steps]
+
+        # Intermediate points in the selected plane
+        mid_x = mid_delta1.x * cos_t + mid_delta1.y * sin_neg_t + mid_center_pos.x
+        mid_y = mid_delta1.x * sin_t + mid_delta1.y * cos_t + mid_center_pos.y
+        mid_z = (mid_next_pos.z - mid_start_pos.z) * (theta / delta_angle) + mid_start_pos.z
+
+        # Transform back
+        if plane_select == 18:  # XZ plane
+            pos_x, pos_y, pos_z = mid_y, mid_z, mid_x
+        elif plane_select == 19:  # YZ plane
+            pos_x, pos_y, pos_z = mid_z, mid_x, mid_y
+        else:
+            pos_x, pos_y, pos_z = mid_x, mid_y, mid_z
+
+        # Scaling, offset and truncation to integers, as in move_to()
+        offset_x, offset_y, offset_z = self.output_offset
+        pos_x = (pos_x + offset_x) * 100.0
+        pos_y = (pos_y + offset_y) * 100.0
+        pos_z = (pos_z + offset_z) * 100.0
+        if self.fixed_point:
+            xs = np.trunc(pos_x + np.copysign(0.5, pos_x)).astype(np.int64)
+            ys = np.trunc(pos_y + np.copysign(0.5, pos_y)).astype(np.int64)
+            zs = np.trunc(pos_z + np.copysign(0.5, pos_z)).astype(np.int64)
+        else:
+            xs = np.trunc(pos_x + 0.5).astype(np.int64)
+            ys = np.trunc(pos_y + 0.5).astype(np.int64)
+            zs = np.trunc(pos_z + 0.5).astype(np.int64)
+        self.emit_moves(xs, ys, zs, feed_speed)
+
+    def emit_moves(self, xs, ys, zs, feed_speed):
+        """Emit consecutive movement commands given as integer NumPy arrays in RML units"""
+        emit_move = self.emit_move
+        for x, y, z in zip(xs.tolist(), ys.tolist(), zs.tolist()):
+            emit_move(x, y, z, feed_speed)
+
+    def return_home(self, via_pos):
+        """Handle G28 - return to home position"""
+        self.rapid_positioning(via_pos)
+        self.rapid_positioning(self.home_position)
+
+    def build_dispatch_tables(self):
+        """Register word handlers: address -> handler(value_str), G/M code -> handler()"""
+        set_state = self.state_setter
+
+        self.address_handlers = {
+            ';': self.end_of_block,
+            'F': self.set_feed_speed,
+            'G': self.g_code,
+            'I': self.set_center_x,
+            'J': self.set_center_y,
+            'K': self.set_center_z,
+            'M': self.m_code,
+            'N': self.sequence_number,
+            'S': self.set_spindle_speed,
+            'X': self.set_x,
+            'Y': self.set_y,
+            'Z': self.set_z,
+        }
+
+        self.g_code_handlers = {
+            0: set_state('mov_mode', 0),  # Rapid positioning
+            1: set_state('mov_mode', 1),  # Linear interpolation
+            2: set_state('mov_mode', 2),  # Circular interpolation CW
+            3: set_state('mov_mode', 3),  # Circular interpolation CCW
+            4: set_state('dwell_enable', 1),  # Dwell
+            17: set_state('plane_select', 17),  # XY plane
+            18: set_state('plane_select', 18),  # XZ plane
+            19: set_state('plane_select', 19),  # YZ plane
+            20: set_state('mm_in', 20),  # Inches
+            21: set_state('mm_in', 21),  # Millimeters
+            28: set_state('mov_mode', 28),  # Return home
+            40: self.cancel_cutter_compensation,  # Cutter radius compensation off
+            41: set_state('TROC_mode', 41),  # Cutter radius compensation left
+            42: set_state('TROC_mode', 42),  # Cutter radius compensation right
+            43: set_state('TLOC_mode', 43),  # Tool length compensation positive
+            44: set_state('TLOC_mode', 44),  # Tool length compensation negative
+            49: set_state('TLOC_mode', 49),  # Tool length compensation cancel
+            90: self.absolute_mode,  # Absolute coordinates
+            91: self.incremental_mode,  # Relative coordinates
+            94: set_state('feed_mode', 94),  # Feed per minute
+            95: set_state('feed_mode', 95),  # Feed per revolution
+        }
+        for g_code in range(54, 60):  # Coordinate systems
+            self.g_code_handlers[g_code] = set_state('coor_sys', g_code - 54)
+
+        self.m_code_handlers = {
+            3: self.spindle_cw,  # Spindle CW
+            4: self.spindle_ccw,  # Spindle CCW
+            5: self.spindle_stop,  # Spindle stop
+        }
+
+    def state_setter(self, name, value):
+        """Handler setting one modal state attribute"""
+        return lambda: setattr(self, name, value)
+
+    def process_word(self, address, value_str):
+        """Process a single G-code word"""
+        handler = self.address_handlers.get(address)
+        if handler is None:
+            self.count_unsupported(address)
+            return
+        try:
+            handler(value_str)
+        except ValueError as e:
+            self.log(f"Value conversion error: {address}{value_str} - {e}")
+
+    def count_unsupported(self, code):
+        self.unsupported_codes[code] = self.unsupported_codes.get(code, 0) + 1
+
+    def end_of_block(self, value_str):
+        if self.coor_changed == 0:
+            return
+
+        # The block is consumed even if its motion fails (e.g. a degenerate arc)
+        try:
+            if self.program is not None:
+                self.program.append_motion(self.mov_mode, self.plane_select, self.next_pos,
+                                           self.center_pos_inc, self.feed_speed)
+            elif self.scan_only:
+                self.scan_motion()
+            elif self.mov_mode == 0:
+                self.rapid_positioning(self.next_pos)
+            elif self.mov_mode == 1:
+                self.linear_interpolation(self.next_pos, self.feed_speed)
+            elif self.mov_mode == 2 or self.mov_mode == 3:
+                self.circular_interpolation(self.next_pos, self.center_pos_inc,
+                                            self.plane_select, self.mov_mode, self.feed_speed)
+            elif self.mov_mode == 28:
+                self.return_home(self.next_pos)
+        finally:
+            self.coor_changed = 0
+            center_pos_inc = self.center_pos_inc
+            center_pos_inc.x = center_pos_inc.y = center_pos_inc.z = 0
+
+    def scan_motion(self):
+        """Track the state a motion block leaves behind without generating it"""
+        if self.mov_mode == 0:
+            self.last_feed_speed = self.rapid_feed_speed
+            self.current_pos = self.next_pos
+        elif self.mov_mode == 1:
+            self.last_feed_speed = self.feed_speed
+            self.current_pos = self.next_pos
+        elif self.mov_mode == 2 or self.mov_mode == 3:
+            # Raises like circular_interpolation for arcs that cannot be generated
+            self.arc_geometry(self.next_pos, self.center_pos_inc, self.plane_select)
+            self.last_feed_speed = self.feed_speed
+            self.current_pos = self.next_pos
+        elif self.mov_mode == 28:
+            self.last_feed_speed = self.rapid_feed_speed
+            self.current_pos = self.home_position
+
+    def g_code(self, value_str):
+        g_code = int(value_str)
+        handler = self.g_code_handlers.get(g_code)
+        if handler is None:
+            self.count_unsupported(f"G{g_code}")
+        else:
+            handler()
+
+    def m_code(self, value_str):
+        m_code = int(value_str)
+        handler = self.m_code_handlers.get(m_code)
+        if handler is None:
+            self.count_unsupported(f"M{m_code}")
+        else:
+            handler()
+
+    def cancel_cutter_compensation(self):
+        self.TROC_mode = 40
+        self.TROC_tool_num = 0
+
+    def absolute_mode(self):
+        self.abs_inc = 90
+        self.emit("^PA;")
+
+    def incremental_mode(self):
+        self.abs_inc = 91
+        self.emit("^PR;")
+
+    def spindle_cw(self):
+        self.spindle_state = 1
+        self.emit("!RC15;!MC1;")
+
+    def spindle_ccw(self):
+        self.spindle_state = -1
+        self.emit("!RC15;!MC1;")
+
+    def spindle_stop(self):
+        self.spindle_state = 0
+        self.emit("!MC0;")
+
+    def sequence_number(self, value_str):
+        """N words only number blocks"""
+
+    def set_feed_speed(self, value_str):
+        self.feed_speed = float(value_str)
+
+    def set_spindle_speed(self, value_str):
+        self.spindle_speed = float(value_str)
+
+    def set_center_x(self, value_str):
+        self.center_pos_inc.x = float(value_str)
+
+    def set_center_y(self, value_str):
+        self.center_pos_inc.y = float(value_str)
+
+    def set_center_z(self, value_str):
+        self.center_pos_inc.z = float(value_str)
+
+    def set_x(self, value_str):
+        val = float(value_str)
+        if self.abs_inc == 91:
+            self.next_pos.x += val
+        else:
+            self.next_pos.x = val
+        self.coor_changed = 1
+
+    def set_y(self, value_str):
+        val = float(value_str)
+        if self.abs_inc == 91:
+            self.next_pos.y += val
+        else:
+            self.next_pos.y = val
+        self.coor_changed = 1
+
+    def set_z(self, value_str):
+        val = float(value_str)
+        if self.abs_inc == 91:
+            self.next_pos.z += val
+        else:
+            self.next_pos.z = val
+        self.coor_changed = 1
+
+    def set_x_fixed(self, value_str):
+        """set_x() of the fixed-point engine
+
+        An absolute word is stored as parsed: for up to 6 decimals its float is
+        already the exact image of its count of 1e-6 mm. Incremental words are
+        added to the count of the position as integers.
+        """
+        if self.abs_inc == 91:
+            self.next_pos.x = (round(float(value_str) * FIXED_SCALE) +
+                               round(self.next_pos.x * FIXED_SCALE)) / FIXED_SCALE
+        else:
+            self.next_pos.x = float(value_str)
+        self.coor_changed = 1
+
+    def set_y_fixed(self, value_str):
+        if self.abs_inc == 91:
+            self.next_pos.y = (round(float(value_str) * FIXED_SCALE) +
+                               round(self.next_pos.y * FIXED_SCALE)) / FIXED_SCALE
+        else:
+            self.next_pos.y = float(value_str)
+        self.coor_changed = 1
+
+    def set_z_fixed(self, value_str):
+        if self.abs_inc == 91:
+            self.next_pos.z = (round(float(value_str) * FIXED_SCALE) +
+                               round(self.next_pos.z * FIXED_SCALE)) / FIXED_SCALE
+        else:
+            self.next_pos.z = float(value_str)
+        self.coor_changed = 1
+
+    def read_lines(self, input_file):
+        """Lazily read lines from a mapped or binary input, reporting progress and taking checkpoints"""
+        offset = input_file.tell()
+        total_size = input_size(input_file) or 1
+        callback_progress = self.callback_progress
+        checkpoints = self.checkpoints
+        digest = self.checkpoint_digest
+        next_checkpoint = offset + self.checkpoint_interval
+        input_end = self.input_end if self.input_end is not None else total_size + 1
+        next_report = 0.0
+        lines_read = self.lines_read
+        raw = b''
+        if isinstance(input_file, mmap.mmap):
+            input_file = iter(input_file.readline, b'')
+        for raw in input_file:
+            # Checkpoint at a line boundary: every earlier line is fully processed
+            if checkpoints is not None:
+                if offset >= next_checkpoint:
+                    self.lines_read = lines_read
+                    self.save_checkpoint(offset)
+                    next_checkpoint = offset + self.checkpoint_interval
+                if digest:
+                    digest.update(raw)
+            if offset >= input_end:
+                break
+            offset += len(raw)
+            lines_read += 1
+
+            # Update progress, at most once per progress_step percent
+            if callback_progress:
+                progress = min(offset / total_size * 100, 100.0)
+                if progress >= next_report:
+                    self.lines_read = lines_read
+                    callback_progress(progress)
+                    next_report = progress + self.progress_step
+
+            line = raw.decode('utf-8', 'ignore')
+            if b'\r' in raw and '\r' in line.rstrip('\r\n'):
+                # Bare CR line endings, split as text mode would
+                yield from line.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+            else:
+                yield line
+
+        self.lines_read = lines_read
+        # A last line without a newline could be extended by appended text
+        if checkpoints is not None and (offset == 0 or raw.endswith(b'\n')):
+            self.save_checkpoint(offset)
+        if callback_progress:
+            callback_progress(100.0)
+
+    def tokenize(self, lines):
+        """Split lines into (address, value) words, each block ending with the (';', '0') word"""
+        return self.split_words(self.strip_comments(lines))
+
+    def strip_comments(self, lines):
+        """Strip comments from lines, yielding the non-empty code left on each
+
+        Parenthesised comments may span lines (the open state is kept in
+        comment_mode) and ';' starts a comment running to the end of the line.
+        Lines starting with '%' are dropped.
+        """
+        comment_mode = self.comment_mode
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+
+            # Remove comments: copy the code between delimiters
+            code = line
+            if comment_mode or COMMENT_DELIMITERS.search(line):
+                parts = []
+                pos = 0
+                while True:
+                    if comment_mode:
+                        end = line.find(')', pos)
+                        if end < 0:
+                            break
+                        comment_mode = False
+                        pos = end + 1
+                        continue
+                    match = COMMENT_DELIMITERS.search(line, pos)
+                    if match is None:
+                        parts.append(line[pos:])
+                        break
+                    parts.append(line[pos:match.start()])
+                    delimiter = match.group()
+                    if delimiter == ';':
+                        break
+                    comment_mode = delimiter == '('
+                    pos = match.end()
+                code = ''.join(parts).strip()
+                self.comment_mode = comment_mode
+
+            if code and code[0] != '%':
+                yield code
+
+    def split_words(self, codes):
+        """Split code lines into (address, value) words, accepting lowercase addresses"""
+        for code in codes:
+            if code.isupper():
+                yield from UPPERCASE_WORD_PATTERN.findall(code)
+            else:
+                for address, value in WORD_PATTERN.findall(code):
+                    yield address.upper(), value
+            yield ';', '0'
+
+    # Modal state saved in checkpoints, besides positions
+    CHECKPOINT_STATE = ('abs_inc', 'mm_in', 'mov_mode', 'plane_select', 'TLOC_mode', 'TROC_mode', 'feed_mode',
+                        'coor_sys', 'feed_speed', 'last_feed_speed', 'spindle_speed', 'spindle_state',
+                        'TROC_tool_num', 'dwell_enable', 'comment_mode', 'lines_read',
+                        'arc_segments', 'arc_segments_fixed', 'unsupported_codes')
+
+    def capture_state(self):
+        state = {name: getattr(self, name) for name in self.CHECKPOINT_STATE}
+        state["unsupported_codes"] = dict(self.unsupported_codes)
+        state["next_pos"] = [self.next_pos.x, self.next_pos.y, self.next_pos.z]
+        state["current_pos"] = [self.current_pos.x, self.current_pos.y, self.current_pos.z]
+        # current_pos may be the very object of next_pos or home_position
+        if self.current_pos is self.next_pos:
+            state["current_pos_is"] = "next_pos"
+        elif self.current_pos is self.home_position:
+            state["current_pos_is"] = "home_position"
+        else:
+            state["current_pos_is"] = None
+        return state
+
+    def restore_state(self, state):
+        for name in self.CHECKPOINT_STATE:
+            setattr(self, name, state[name])
+        self.unsupported_codes = dict(state["unsupported_codes"])
+        self.next_pos = Vector(*state["next_pos"])
+        self.center_pos_inc = Vector(0, 0, 0)
+        self.coor_changed = 0
+        if state["current_pos_is"] == "next_pos":
+            self.current_pos = self.next_pos
+        elif state["current_pos_is"] == "home_position":
+            self.current_pos = self.home_position
+        else:
+            self.current_pos = Vector(*state["current_pos"])
+
+    def save_checkpoint(self, input_offset):
+        """Record the state reached after all input before input_offset"""
+        self.checkpoints.append({
+            "input_offset": input_offset,
+            "input_hash": self.checkpoint_digest.hexdigest() if self.checkpoint_digest else None,
+            "output_offset": self.writer.position() if self.writer else 0,
+            "state": self.capture_state(),
+            "compactor": self.compactor.capture_state() if self.compactor else None,
+        })
+
+    def checkpoint_file_path(self, output_file_path):
+        return output_file_path + ".ckpt"
+
+    def find_checkpoint(self, input_file_path, output_file_path):
+        """Last saved checkpoint whose input prefix is unchanged, or None
+
+        Checkpoints up to the returned one are kept in self.checkpoints and
+        self.checkpoint_digest continues from its input offset.
+        """
+        try:
+            with open(self.checkpoint_file_path(output_file_path), 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            stat = os.stat(output_file_path)
+        except (OSError, ValueError):
+            return None
+        if (saved.get("version") != CONVERTER_VERSION or saved.get("settings") != self.effective_settings()
+                or saved.get("output_size") != stat.st_size or saved.get("output_mtime_ns") != stat.st_mtime_ns):
+            return None
+
+        resume = None
+        digest = hashlib.sha256()
+        hashed = 0
+        try:
+            with open(input_file_path, 'rb') as f:
+                for checkpoint in saved["checkpoints"]:
+                    while hashed < checkpoint["input_offset"]:
+                        block = f.read(min(1024 * 1024, checkpoint["input_offset"] - hashed))
+                        if not block:
+                            break
+                        digest.update(block)
+                        hashed += len(block)
+                    if digest.hexdigest() != checkpoint["input_hash"]:
+                        break
+                    resume = checkpoint
+                    self.checkpoints.append(checkpoint)
+                    self.checkpoint_digest = digest.copy()
+        except OSError:
+            return None
+        return resume
+
+    def save_checkpoint_file(self, output_file_path, success):
+        path = self.checkpoint_file_path(output_file_path)
+        try:
+            if not success:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            stat = os.stat(output_file_path)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": CONVERTER_VERSION,
+                    "settings": self.effective_settings(),
+                    "output_size": stat.st_size,
+                    "output_mtime_ns": stat.st_mtime_ns,
+                    "checkpoints": self.checkpoints,
+                }, f)
+        except OSError as e:
+            self.log(f"Could not save checkpoints: {e}")
+        finally:
+            self.checkpoints = None
+            self.checkpoint_digest = None
+
+    def load_settings(self, setting_file_path=None):
+        """Import settings, apply overrides and reset per-conversion statistics"""
+        setting_file = setting_file_path or DEFAULT_SETTING_FILE
+        if os.path.exists(setting_file):
+            self.import_settings(setting_file)
+        else:
+            self.log(f"Settings file {setting_file} not found, using default values")
+        for name, value in self.overrides.items():
+            setattr(self, name, value)
+        self.prepare_output()
+
+        self.arc_segments = 0
+        self.arc_segments_fixed = 0
+        self.unsupported_codes = {}
+        self.stats = ConversionStats() if self.collect_stats else None
+        self.estimate = JobEstimate(self.acceleration, self.work_area) if self.collect_estimate else None
+
+    def parse(self, input_file):
+        """Run G-code from a binary input file: read -> tokenize -> process_word -> emit"""
+        if self.stats is None:
+            for address, value in self.tokenize(self.read_lines(input_file)):
+                self.process_word(address, value)
+            return
+
+        # Time every stage of the pipeline separately
+        stats = self.stats
+        lines = stats.iterate(self.read_lines(input_file), 'read')
+        codes = stats.iterate(self.strip_comments(lines), 'strip')
+        for address, value in stats.iterate(self.split_words(codes), 'tokenize'):
+            self.process_word(address, value)
+
+    def instrument(self, motion=True):
+        """Route word dispatch, arcs and formatting through the stats timers and counters
+
+        With motion False, while compiling, only the words are counted and
+        timed: the blocks are counted when the program is replayed.
+        """
+        stats = self.stats
+        process_word = stats.wrap(self.process_word, 'dispatch')
+        emit_move = stats.wrap(self.emit_move, 'format')
+        motion_codes = stats.MOTION_CODES if motion else {}
+
+        def counted_process_word(address, value_str):
+            if address != ';':
+                stats.words += 1
+            elif self.coor_changed and self.mov_mode in motion_codes:
+                stats.blocks[motion_codes[self.mov_mode]] += 1
+            process_word(address, value_str)
+
+        def counted_emit_move(x, y, z, feed_speed):
+            if feed_speed != self.last_feed_speed:
+                stats.v_changes += 1
+            emit_move(x, y, z, feed_speed)
+
+        self.process_word = counted_process_word
+        if not motion:
+            return
+        self.circular_interpolation = stats.wrap(self.circular_interpolation, 'arc')
+        self.emit_move = counted_emit_move
+        self.emit = stats.wrap(self.emit, 'write')
+
+    def attach_preview(self):
+        """Feed every generated move to the preview, flagged as rapid by the current motion mode
+
+        Arc points come as arrays through emit_moves and are added in one
+        piece, so emit_move only adds the moves it gets outside of them.
+        """
+        preview = self.preview
+        pending = preview.pending
+        append = pending.append
+        batch = preview.BATCH
+        emit_move = self.emit_move
+        emit_moves = self.emit_moves
+        in_path = False
+
+        def previewed_emit_move(x, y, z, feed_speed):
+            if not in_path:
+                append((x, y, self.mov_mode in RAPID_MODES))
+                if len(pending) >= batch:
+                    preview.flush()
+            emit_move(x, y, z, feed_speed)
+
+        def previewed_emit_moves(xs, ys, zs, feed_speed):
+            nonlocal in_path
+            if len(xs):
+                preview.add_path(xs, ys, self.mov_mode in RAPID_MODES)
+            in_path = True
+            try:
+                emit_moves(xs, ys, zs, feed_speed)
+            finally:
+                in_path = False
+
+        self.emit_move = previewed_emit_move
+        self.emit_moves = previewed_emit_moves
+
+    def attach_estimate(self):
+        """Feed every generated move to the job estimate, arc points as arrays like attach_preview()"""
+        estimate = self.estimate
+        emit_move = self.emit_move
+        emit_moves = self.emit_moves
+        in_path = False
+
+        def estimated_emit_move(x, y, z, feed_speed):
+            if not in_path:
+                estimate.add(x, y, z, feed_speed, self.mov_mode in RAPID_MODES)
+            emit_move(x, y, z, feed_speed)
+
+        def estimated_emit_moves(xs, ys, zs, feed_speed):
+            nonlocal in_path
+            if len(xs):
+                estimate.add_path(xs, ys, zs, feed_speed, self.mov_mode in RAPID_MODES)
+            in_path = True
+            try:
+                emit_moves(xs, ys, zs, feed_speed)
+            finally:
+                in_path = False
+
+        self.emit_move = estimated_emit_move
+        self.emit_moves = estimated_emit_moves
+
+    def uninstrument(self):
+        for name in ('process_word', 'circular_interpolation', 'emit_move', 'emit_moves'):
+            self.__dict__.pop(name, None)
+
+    def write_output(self, output_file_path, generate, resume=None):
+        """Write an RML file around the commands emitted by generate()
+
+        Commands go to a temporary file next to the output that replaces it
+        only once complete, so a failed conversion never leaves a truncated
+        file. With a resume checkpoint, the existing file up to the
+        checkpoint's output offset is copied first and generate() continues
+        from there.
+        """
+        temp_path = None
+        complete = False
+        try:
+            temp_path = temp_file_for(output_file_path)
+            if resume is not None:
+                with open(output_file_path, 'rb') as previous, open(temp_path, 'wb') as f:
+                    remaining = resume["output_offset"]
+                    while remaining > 0:
+                        block = previous.read(min(remaining, 1024 * 1024))
+                        if not block:
+                            break
+                        f.write(block)
+                        remaining -= len(block)
+            output_file = open(temp_path, 'a', encoding='utf-8')
+        except Exception as e:
+            self.log(f"Error writing file: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+        try:
+            with output_file:
+                self.write_stream(output_file, generate, resume)
+            os.replace(temp_path, output_file_path)
+            complete = True
+        except OSError as e:
+            self.log(f"Error writing file: {e}")
+            return False
+        finally:
+            if not complete and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self.log_summary()
+        return True
+
+    def write_stream(self, stream, generate, resume=None, chunk_size=65536):
+        """Write the RML header, the commands emitted by generate() and the trailer to a text stream"""
+        # Commands stream through a buffered writer instead of being collected in memory
+        writer = RMLWriter(stream, chunk_size)
+        self.emit = writer.write
+        compactor = None
+        if self.compact_moves:
+            compactor = RMLCompactor(writer.write, self.compact_tolerance)
+            self.emit = compactor.write
+        self.writer = writer
+        self.compactor = compactor
+        try:
+            if resume is None:
+                # Initialize output file
+                for command in RML_HEADER:
+                    self.emit(command)
+            else:
+                writer.written = resume["output_offset"]
+                if compactor:
+                    compactor.restore_state(resume["compactor"])
+
+            if self.preview is not None:
+                self.attach_preview()
+            if self.estimate is not None:
+                self.attach_estimate()
+            if self.stats:
+                self.instrument()
+            generate()
+            if self.preview is not None:
+                self.preview.finish()
+            if self.estimate is not None:
+                self.estimate.finish()
+
+            # Final command
+            self.emit("^IN;")
+            writer.flush()
+            if compactor:
+                self.log(f"Compaction: {compactor.moves_in} -> {compactor.moves_out} move commands")
+        finally:
+            self.uninstrument()
+            self.emit = self.output_lines.append
+            self.writer = None
+            self.compactor = None
+
+    def log_summary(self):
+        """Log what was ignored or saved during the conversion, and the statistics"""
+        if self.unsupported_codes:
+            ignored = ", ".join(f"{code} x{count}" for code, count in sorted(self.unsupported_codes.items()))
+            self.log(f"Unsupported codes ignored: {ignored}")
+        if self.arc_chord_tolerance > 0:
+            saved = self.arc_segments_fixed - self.arc_segments
+            self.log(f"Arc segments: {self.arc_segments} "
+                     f"({saved} saved by chord tolerance {self.arc_chord_tolerance} mm)")
+        if self.estimate is not None and self.estimate.moves:
+            self.log(self.estimate.report())
+        if self.stats:
+            self.stats.finish(self)
+            self.log("Statistics:\n" + self.stats.report())
+
+    def send(self, input_file_path, streamer, setting_file_path=None):
+        """Convert a G-code file while streaming the RML to a device through an RMLStreamer"""
+        self.log(f"Streaming to {streamer.device}...")
+        self.load_settings(setting_file_path)
+        self.comment_mode = False
+        self.lines_read = 0
+
+        if self.optimize_rapids:
+            # Reordering needs the whole program: compile it before the device is opened
+            program = self.compile(input_file_path)
+            if program is None:
+                return False
+            program = self.prepare_replay(program)
+            input_file = None
+            generate = lambda: self.replay(program)
+        else:
+            try:
+                input_file = map_input(input_file_path)
+            except Exception as e:
+                self.log(f"Error reading file: {e}")
+                return False
+            generate = lambda: self.parse(input_file)
+
+        try:
+            try:
+                streamer.open()
+            except (OSError, ValueError) as e:
+                self.log(f"Error opening device: {e}")
+                return False
+            try:
+                # Small chunks: the machine starts on the first commands
+                self.write_stream(streamer, generate, chunk_size=streamer.packet_size)
+                streamer.close()
+            except OSError as e:
+                streamer.close(discard=True)
+                self.log(f"Error sending to device: {e}")
+                return False
+            except BaseException:
+                streamer.close(discard=True)
+                raise
+        finally:
+            if input_file is not None:
+                input_file.close()
+
+        self.log_summary()
+        self.log(f"Transmission completed: {streamer.sent} bytes sent to {streamer.device}")
+        return True
+
+    def convert(self, input_file_path, output_file_path, setting_file_path=None):
+        """Main conversion method"""
+        self.log("Starting conversion...")
+        self.load_settings(setting_file_path)
+
+        # Reuse a cached result of the same input and settings
+        cache_key = None
+        if self.cache:
+            try:
+                cache_key = self.cache.key(input_file_path, self.effective_settings())
+                if self.cache.get(cache_key, output_file_path):
+                    if self.preview is not None:
+                        self.preview.load_rml(output_file_path, self.rapid_feed_speed)
+                    if self.estimate is not None:
+                        self.estimate.load_rml(output_file_path, self.rapid_feed_speed)
+                        self.log(self.estimate.report())
+                    if self.callback_progress:
+                        self.callback_progress(100.0)
+                    self.log(f"Cached result reused\nFile saved: {output_file_path}")
+                    return True
+            except OSError as e:
+                self.log(f"Cache unavailable: {e}")
+                cache_key = None
+
+        self.comment_mode = False
+        self.lines_read = 0
+        if self.optimize_rapids:
+            # Reordering needs the whole program: compile it, then emit the optimized order
+            program = self.compile(input_file_path)
+            if program is None or not self.write_program(program, output_file_path):
+                return False
+            self.store_cached(cache_key, output_file_path)
+            self.log(f"Conversion completed successfully!\nFile saved: {output_file_path}")
+            return True
+
+        # Resume from the last checkpoint before the first changed line
+        resume = None
+        if self.incremental:
+            self.checkpoints = []
+            self.checkpoint_digest = hashlib.sha256()
+            resume = self.find_checkpoint(input_file_path, output_file_path)
+
+        # Open input file
+        try:
+            input_file = map_input(input_file_path)
+        except Exception as e:
+            self.log(f"Error reading file: {e}")
+            self.checkpoints = None
+            return False
+
+        with input_file:
+            if resume:
+                self.restore_state(resume["state"])
+                input_file.seek(resume["input_offset"])
+                self.log(f"Resuming at line {self.lines_read + 1} from a checkpoint")
+            success = self.write_output(output_file_path, lambda: self.parse(input_file), resume)
+
+        if self.incremental:
+            self.save_checkpoint_file(output_file_path, success)
+        if not success:
+            return False
+
+        self.store_cached(cache_key, output_file_path)
+        self.log(f"Conversion completed successfully!\nFile saved: {output_file_path}")
+        return True
+
+    def store_cached(self, cache_key, output_file_path):
+        if cache_key:
+            try:
+                self.cache.put(cache_key, output_file_path)
+            except OSError as e:
+                self.log(f"Could not store result in cache: {e}")
+
+    def scan_chunks(self, input_file, count):
+        """Pre-scan the input for modal state only, returning count chunk starts
+
+        Each start is a checkpoint dict at a line boundary; the first is the
+        fresh state at offset 0.
+        """
+        size = input_size(input_file)
+        callback_log, stats, emit = self.callback_log, self.stats, self.emit
+        self.callback_log = None  # the chunk conversions report the same errors
+        self.stats = None  # and count the same reading and tokenizing
+        self.emit = lambda command: None  # mode and spindle commands are generated by the chunks
+        self.scan_only = True
+        self.checkpoints = [{"input_offset": 0, "state": self.capture_state()}]
+        checkpoint_interval = self.checkpoint_interval
+        self.checkpoint_interval = -(-size // count)
+        try:
+            self.parse(input_file)
+            return [checkpoint for checkpoint in self.checkpoints if checkpoint["input_offset"] < size]
+        finally:
+            self.callback_log, self.stats, self.emit = callback_log, stats, emit
+            self.scan_only = False
+            self.checkpoints = None
+            self.checkpoint_interval = checkpoint_interval
+
+    def convert_chunk(self, input_file_path, chunk_file_path, start, end, state, setting_file_path=None):
+        """Convert input[start:end] from a pre-scanned state, writing only its commands"""
+        self.overrides = dict(self.overrides, compact_moves=False)
+        self.load_settings(setting_file_path)
+        self.restore_state(state)
+        self.arc_segments = 0
+        self.arc_segments_fixed = 0
+        self.unsupported_codes = {}
+        self.input_end = end
+
+        with map_input(input_file_path) as input_file, open(chunk_file_path, 'w', encoding='utf-8') as chunk_file:
+            input_file.seek(start)
+            writer = RMLWriter(chunk_file)
+            self.emit = writer.write
+            try:
+                if self.stats:
+                    self.instrument()
+                self.parse(input_file)
+                writer.flush()
+            finally:
+                self.uninstrument()
+                self.emit = self.output_lines.append
+
+    def convert_chunked(self, input_file_path, output_file_path, setting_file_path=None, workers=None):
+        """Convert one large file in parallel chunks, stitched into the same output as convert()
+
+        A sequential pre-scan finds the modal state at each chunk start, the
+        chunks are converted by a process pool, and their commands are
+        concatenated in order. The result cache and checkpoints are not used.
+        """
+        workers = workers or os.cpu_count() or 1
+        try:
+            size = os.path.getsize(input_file_path)
+        except OSError as e:
+            self.log(f"Error reading file: {e}")
+            return False
+        count = max(1, min(workers, size // CHUNK_MIN_SIZE))
+        if count == 1:
+            return self.convert(input_file_path, output_file_path, setting_file_path)
+
+        self.load_settings(setting_file_path)
+        if self.optimize_rapids:
+            # Segments are reordered across the whole program
+            return self.convert(input_file_path, output_file_path, setting_file_path)
+        self.log(f"Starting conversion in {count} chunks...")
+        self.comment_mode = False
+        self.lines_read = 0
+        with map_input(input_file_path) as input_file:
+            starts = self.scan_chunks(input_file, count)
+        ends = [start["input_offset"] for start in starts[1:]] + [size]
+        chunk_paths = [f"{output_file_path}.part{index}" for index in range(len(starts))]
+        options = dict(self.overrides, collect_stats=self.collect_stats)
+        jobs = [(input_file_path, path, start["input_offset"], end, start["state"], setting_file_path, options)
+                for path, start, end in zip(chunk_paths, starts, ends)]
+
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                results = []
+                for index, result in enumerate(pool.map(convert_chunk, jobs)):
+                    results.append(result)
+                    if self.callback_progress:
+                        self.callback_progress((index + 1) * 100.0 / len(jobs))
+
+            self.arc_segments = 0
+            self.arc_segments_fixed = 0
+            self.unsupported_codes = {}
+            for messages, arc_segments, arc_segments_fixed, unsupported_codes, stats in results:
+                for message in messages:
+                    self.log(message)
+                if stats:
+                    self.stats.merge(stats)
+                self.arc_segments += arc_segments
+                self.arc_segments_fixed += arc_segments_fixed
+                for code, number in unsupported_codes.items():
+                    self.unsupported_codes[code] = self.unsupported_codes.get(code, 0) + number
+
+            success = self.write_output(output_file_path, lambda: self.stitch_chunks(chunk_paths))
+        finally:
+            for path in chunk_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        if not success:
+            return False
+        if self.estimate is not None:
+            # The chunks bypass emit_move: estimate from the stitched result
+            self.estimate.load_rml(output_file_path, self.rapid_feed_speed)
+            self.log(self.estimate.report())
+        self.log(f"Conversion completed successfully!\nFile saved: {output_file_path}")
+        return True
+
+    def estimate_job(self, input_file_path, setting_file_path=None):
+        """Estimate machining time and envelope into self.estimate, without formatting any RML
+
+        The moves take the same path as in a conversion, through the rapid
+        optimizer when enabled and the statistics counters, only the RML
+        commands are dropped.
+        """
+        self.log("Estimating...")
+        self.load_settings(setting_file_path)
+        self.estimate = JobEstimate(self.acceleration, self.work_area)
+        self.comment_mode = False
+        self.lines_read = 0
+
+        if self.optimize_rapids:
+            program = self.compile(input_file_path)
+            if program is None:
+                return False
+            program = self.prepare_replay(program)
+            generate = lambda: self.replay(program)
+        else:
+            try:
+                input_file = map_input(input_file_path)
+            except Exception as e:
+                self.log(f"Error reading file: {e}")
+                return False
+
+            def generate():
+                with input_file:
+                    self.parse(input_file)
+
+        def skip_move(x, y, z, feed_speed):
+            self.last_feed_speed = feed_speed
+
+        def skip_moves(xs, ys, zs, feed_speed):
+            # The points of an arc share its feed, so its last point stands for all of them
+            if len(xs):
+                self.emit_move(int(xs[-1]), int(ys[-1]), int(zs[-1]), feed_speed)
+
+        self.emit = lambda command: None
+        self.emit_move = skip_move
+        self.emit_moves = skip_moves
+        self.attach_estimate()
+        if self.stats:
+            self.instrument()
+        try:
+            generate()
+        except Exception as e:
+            self.log(f"Error estimating: {e}")
+            return False
+        finally:
+            self.uninstrument()
+            self.emit = self.output_lines.append
+        self.estimate.finish()
+        self.log_summary()
+        return True
+
+    def stitch_chunks(self, chunk_paths):
+        """Emit the commands of converted chunk files in order"""
+        for path in chunk_paths:
+            with open(path, 'r', encoding='utf-8') as chunk_file:
+                if self.compactor is None:
+                    # Nothing to rewrite: copy the chunk behind the buffered header
+                    self.writer.flush()
+                    shutil.copyfileobj(chunk_file, self.writer.stream)
+                    self.writer.written += os.fstat(chunk_file.fileno()).st_size
+                    continue
+                rest = ''
+                for block in iter(lambda: chunk_file.read(CHUNK_READ_SIZE), ''):
+                    commands = (rest + block).split(';')
+                    rest = commands.pop()
+                    for command in commands:
+                        self.emit(command + ';')
+
+    def compile(self, input_file_path):
+        """Parse a G-code file into a CompiledProgram, or None on error"""
+        self.log("Compiling...")
+        try:
+            input_file = map_input(input_file_path)
+        except Exception as e:
+            self.log(f"Error reading file: {e}")
+            return None
+
+        program = CompiledProgram()
+        self.program = program
+        self.emit = program.append_command
+        if self.stats:
+            self.instrument(motion=False)
+        try:
+            with input_file:
+                self.parse(input_file)
+        finally:
+            self.uninstrument()
+            self.program = None
+            self.emit = self.output_lines.append
+        self.log(f"Compiled {len(program)} records")
+        return program
+
+    def replay(self, program):
+        """Run the records of a CompiledProgram through the motion handlers"""
+        next_pos = self.next_pos
+        center_pos_inc = self.center_pos_inc
+        total = len(program) or 1
+        next_report = 0.0
+        for index, (kind, plane, target, center, feed) in enumerate(program):
+            if self.callback_progress and index * 100 / total >= next_report:
+                self.callback_progress(index * 100 / total)
+                next_report = index * 100 / total + self.progress_step
+
+            command = IR_COMMANDS.get(kind)
+            if command:
+                self.emit(command)
+                continue
+            next_pos.x, next_pos.y, next_pos.z = target
+            center_pos_inc.x, center_pos_inc.y, center_pos_inc.z = center
+            self.mov_mode = kind
+            self.plane_select = plane
+            self.feed_speed = feed
+            self.coor_changed = 1
+            self.process_word(';', '0')
+        if self.callback_progress:
+            self.callback_progress(100.0)
+
+    def emit_program(self, program, output_file_path, setting_file_path=None):
+        """Write a CompiledProgram as RML under the current settings, without reparsing"""
+        self.load_settings(setting_file_path)
+        return self.emit_loaded_program(program, output_file_path)
+
+    def emit_loaded_program(self, program, output_file_path):
+        """emit_program() with the settings already loaded"""
+        self.log("Emitting compiled program...")
+        if not self.write_program(program, output_file_path):
+            return False
+        self.log(f"Conversion completed successfully!\nFile saved: {output_file_path}")
+        return True
+
+    def write_program(self, program, output_file_path):
+        """Write a CompiledProgram as RML, reordering its rapids first when enabled"""
+        program = self.prepare_replay(program)
+        return self.write_output(output_file_path, lambda: self.replay(program))
+
+    def prepare_replay(self, program):
+        """Reorder the rapids of a CompiledProgram when enabled and reset the motion state for replay()"""
+        if self.optimize_rapids:
+            optimizer = RapidOptimizer(self.safe_z)
+            program = optimizer.optimize(program)
+            saved = (optimizer.travel_before - optimizer.travel_after) / (self.rapid_feed_speed / 60)
+            self.log(f"Rapid optimization: {optimizer.segments} segments in {optimizer.groups} groups, "
+                     f"travel {optimizer.travel_before:.1f} -> {optimizer.travel_after:.1f} mm, "
+                     f"about {saved:.1f} s saved")
+
+        # Start from the same motion state as a fresh conversion
+        self.next_pos = Vector(0, 0, 0)
+        self.center_pos_inc = Vector(0, 0, 0)
+        self.current_pos = Vector(0, 0, 0)
+        self.last_feed_speed = None
+        return program
+
+
+# ==================== Chunked Conversion ====================
+
+# Smallest input chunk worth a separate worker process
+CHUNK_MIN_SIZE = 1024 * 1024
+CHUNK_READ_SIZE = 1024 * 1024
+
+
+def convert_chunk(job):
+    """Convert one chunk of a file with a fresh converter (runs inside a worker process)"""
+    input_path, chunk_path, start, end, state, setting_file, options = job
+    converter = GCode2RMLConverter()
+    converter.overrides = options
+    messages = []
+    converter.callback_log = messages.append
+    converter.convert_chunk(input_path, chunk_path, start, end, state, setting_file)
+    return (messages, converter.arc_segments, converter.arc_segments_fixed, converter.unsupported_codes,
+            converter.stats)
+
+
+# ==================== Toolpath Preview ====================
+
+# Motion modes drawn as rapids
+RAPID_MODES = (0, 28)
+
+
+class PreviewLevel:
+    """One level of the preview pyramid: XY points with a grid index over chunks of them
+
+    A level keeps the point where the path enters another cell of a grid
+    with its tolerance as spacing, plus the last point of every rapid or
+    feed run so the two stay apart. Batches are thinned with NumPy array
+    operations when it is installed, in a loop with the same result otherwise.
+    """
+
+    CHUNK = 256  # points per indexed chunk
+    MAX_CELLS = 256  # chunks overlapping more grid cells are checked against every view
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance  # grid spacing of kept points, RML units, 0: every distinct point
+        self.cell_size = 1  # index grid spacing, the median chunk extent
+        self.xs = array.array('i')
+        self.ys = array.array('i')
+        self.rapid = array.array('b')  # kind of the segment ending at each point
+        self.boxes = []  # bounding box of each closed chunk
+        self.grid = {}  # (cell_x, cell_y) -> closed chunks overlapping the cell
+        self.wide = []  # closed chunks spanning more than MAX_CELLS cells
+        self.indexed = 0  # closed chunks when the grid was last sized
+        self.last = None  # (cell_x, cell_y, x, y, kind) of the last point offered, kept or not
+        self.last_kept = False
+
+    def __len__(self):
+        return len(self.xs)
+
+    def extend(self, xs, ys, rapid):
+        """Thin a batch of points from the level below, returning the kept ones as (xs, ys, rapid)
+
+        The batch is three NumPy arrays when NumPy is installed, lists otherwise.
+        """
+        if np is None:
+            return self.extend_points(xs, ys, rapid)
+        size = max(self.tolerance, 1)
+        cells_x = xs // size
+        cells_y = ys // size
+        keep = np.empty(len(xs), dtype=bool)
+        keep[1:] = (cells_x[1:] != cells_x[:-1]) | (cells_y[1:] != cells_y[:-1])
+        last = self.last
+        keep[0] = last is None or cells_x[0] != last[0] or cells_y[0] != last[1]
+        # Keep the end of a run so rapids and feeds stay apart
+        keep[:-1] |= rapid[1:] != rapid[:-1]
+        kept_xs, kept_ys, kept_rapid = xs[keep], ys[keep], rapid[keep]
+        if last is not None and not self.last_kept and last[4] != rapid[0]:
+            kept_xs = np.concatenate(([last[2]], kept_xs))
+            kept_ys = np.concatenate(([last[3]], kept_ys))
+            kept_rapid = np.concatenate(([last[4]], kept_rapid))
+        self.last = (int(cells_x[-1]), int(cells_y[-1]), int(xs[-1]), int(ys[-1]), bool(rapid[-1]))
+        self.last_kept = bool(keep[-1])
+        self.xs.frombytes(kept_xs.astype(np.int32).tobytes())
+        self.ys.frombytes(kept_ys.astype(np.int32).tobytes())
+        self.rapid.frombytes(kept_rapid.astype(np.int8).tobytes())
+        self.index_chunks()
+        return kept_xs, kept_ys, kept_rapid
+
+    def extend_points(self, xs, ys, rapid):
+        """extend() for lists, one point at a time"""
+        size = max(self.tolerance, 1)
+        kept_xs = []
+        kept_ys = []
+        kept_rapid = []
+        last = self.last
+        last_kept = self.last_kept
+        for x, y, kind in zip(xs, ys, rapid):
+            cell_x = x // size
+            cell_y = y // size
+            if last is not None:
+                if not last_kept and last[4] != kind:
+                    kept_xs.append(last[2])
+                    kept_ys.append(last[3])
+                    kept_rapid.append(last[4])
+                if cell_x == last[0] and cell_y == last[1]:
+                    last = (cell_x, cell_y, x, y, kind)
+                    last_kept = False
+                    continue
+            kept_xs.append(x)
+            kept_ys.append(y)
+            kept_rapid.append(kind)
+            last = (cell_x, cell_y, x, y, kind)
+            last_kept = True
+        self.last = last
+        self.last_kept = last_kept
+        self.append(kept_xs, kept_ys, kept_rapid)
+        return kept_xs, kept_ys, kept_rapid
+
+    def finish(self, point):
+        """End with the final point of the path, so every level stops where the job does"""
+        if not self.xs or self.xs[-1] != point[0] or self.ys[-1] != point[1]:
+            self.append([point[0]], [point[1]], [point[2]])
+        self.last = (None, None) + tuple(point)
+        self.last_kept = True
+
+    def append(self, xs, ys, rapid):
+        self.xs.extend(xs)
+        self.ys.extend(ys)
+        self.rapid.extend(rapid)
+        self.index_chunks()
+
+    def index_chunks(self):
+        """Index the chunks filled since the last call, sizing the grid again as their number doubles"""
+        while len(self.xs) >= (len(self.boxes) + 1) * self.CHUNK:
+            self.boxes.append(self.chunk_box(len(self.boxes)))
+            if len(self.boxes) >= 2 * self.indexed:
+                self.regrid()
+            else:
+                self.index_chunk(len(self.boxes) - 1)
+
+    def regrid(self):
+        """Size the grid cells from the median chunk extent and index every closed chunk again"""
+        extents = sorted(max(box[2] - box[0], box[3] - box[1]) for box in self.boxes)
+        self.cell_size = max(extents[len(extents) // 2], 1)
+        self.grid = {}
+        self.wide = []
+        self.indexed = len(self.boxes)
+        for chunk in range(len(self.boxes)):
+            self.index_chunk(chunk)
+
+    def chunk_box(self, chunk):
+        """[min_x, min_y, max_x, max_y] of a chunk and the point before it"""
+        start = max(chunk * self.CHUNK - 1, 0)
+        end = (chunk + 1) * self.CHUNK
+        xs = self.xs[start:end]
+        ys = self.ys[start:end]
+        if np is not None:  # views of the copied slices, the level itself can still grow
+            xs = np.frombuffer(xs, dtype=np.int32)
+            ys = np.frombuffer(ys, dtype=np.int32)
+            return [int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max())]
+        return [min(xs), min(ys), max(xs), max(ys)]
+
+    def cells(self, box):
+        size = self.cell_size
+        return (range(box[0] // size, box[2] // size + 1), range(box[1] // size, box[3] // size + 1))
+
+    def index_chunk(self, chunk):
+        columns, rows = self.cells(self.boxes[chunk])
+        if len(columns) * len(rows) > self.MAX_CELLS:
+            self.wide.append(chunk)
+            return
+        for column in columns:
+            for row in rows:
+                self.grid.setdefault((column, row), []).append(chunk)
+
+    def query(self, box):
+        """Sorted ids of the chunks whose bounding boxes overlap box"""
+        boxes = self.boxes
+        closed = len(boxes)
+        columns, rows = self.cells(box)
+        if len(columns) * len(rows) > 4 * closed:
+            candidates = range(closed)
+        else:
+            candidates = set(self.wide)
+            for column in columns:
+                for row in rows:
+                    candidates.update(self.grid.get((column, row), ()))
+        chunks = sorted(chunk for chunk in candidates if chunk < closed and
+                        boxes[chunk][0] <= box[2] and boxes[chunk][2] >= box[0] and
+                        boxes[chunk][1] <= box[3] and boxes[chunk][3] >= box[1])
+
+        # The open chunk is not indexed yet
+        if len(self.xs) > closed * self.CHUNK:
+            open_box = self.chunk_box(closed)
+            if open_box[0] <= box[2] and open_box[2] >= box[0] and open_box[1] <= box[3] and open_box[3] >= box[1]:
+                chunks.append(closed)
+        return chunks
+
+
+class ToolpathPreview:
+    """Level-of-detail model of the XY toolpath, built incrementally from the move stream
+
+    Level 0 holds every move; each higher level thins the one below to one
+    point per cell of a 4x coarser grid, keeping the points where rapids and
+    feeds alternate. Moves are passed up the pyramid in batches as they
+    arrive, so building keeps pace with the conversion instead of needing
+    a second pass.
+    """
+
+    LEVELS = 7
+    BASE_TOLERANCE = 4  # level 1 point spacing, RML units (0.01 mm)
+    BATCH = 1024  # moves collected before they are added to the pyramid
+
+    def __init__(self):
+        self.levels = [PreviewLevel(self.BASE_TOLERANCE * 4 ** (level - 1) if level else 0)
+                       for level in range(self.LEVELS)]
+        self.bounds = None  # [min_x, min_y, max_x, max_y] of every move
+        self.moves = 0  # moves added to the pyramid
+        self.last = None
+        self.pending = []  # (x, y, rapid) of the latest moves not yet in the pyramid
+        self.paths = []  # (xs, ys, rapid) arrays of the earlier moves not yet in the pyramid
+        self.path_moves = 0  # moves in self.paths
+
+    def add(self, x, y, rapid):
+        """Add a move to (x, y) in RML units"""
+        self.pending.append((x, y, rapid))
+        if len(self.pending) >= self.BATCH:
+            self.flush()
+
+    def add_path(self, xs, ys, rapid):
+        """Add consecutive moves given as integer NumPy arrays in RML units"""
+        self.collect()
+        self.paths.append((xs, ys, np.full(len(xs), rapid, dtype=bool)))
+        self.path_moves += len(xs)
+        if self.path_moves >= self.BATCH:
+            self.flush()
+
+    def collect(self):
+        """Move the pending moves to self.paths as arrays (lists without NumPy)"""
+        pending = self.pending
+        if not pending:
+            return
+        if np is not None:
+            batch = np.array(pending, dtype=np.int64)
+            self.paths.append((batch[:, 0], batch[:, 1], batch[:, 2].astype(bool)))
+        else:
+            self.paths.append(tuple(list(column) for column in zip(*pending)))
+        self.path_moves += len(pending)
+        del pending[:]  # emptied in place, attach_preview appends to this list directly
+
+    def flush(self):
+        """Pass the collected moves up the pyramid"""
+        self.collect()
+        paths = self.paths
+        if not paths:
+            return
+        if np is not None:
+            xs, ys, rapid = (np.concatenate(column) for column in zip(*paths))
+            bounds = [int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max())]
+            self.last = (int(xs[-1]), int(ys[-1]), bool(rapid[-1]))
+        else:
+            xs, ys, rapid = ([value for path in column for value in path] for column in zip(*paths))
+            bounds = [min(xs), min(ys), max(xs), max(ys)]
+            self.last = (xs[-1], ys[-1], rapid[-1])
+        self.paths = []
+        self.path_moves = 0
+        self.extend(xs, ys, rapid, bounds)
+
+    def extend(self, xs, ys, rapid, bounds):
+        """Pass moves within bounds up the pyramid until a level drops them all"""
+        count = len(xs)
+        if self.bounds is not None:
+            bounds = [min(self.bounds[0], bounds[0]), min(self.bounds[1], bounds[1]),
+                      max(self.bounds[2], bounds[2]), max(self.bounds[3], bounds[3])]
+        for level in self.levels:
+            xs, ys, rapid = level.extend(xs, ys, rapid)
+            if not len(xs):
+                break
+        self.bounds = bounds
+        self.moves += count
+
+    def finish(self):
+        self.flush()
+        if self.last is not None:
+            for level in self.levels:
+                level.finish(self.last)
+
+    def level_for(self, scale):
+        """Coarsest level whose point spacing stays within about a pixel at scale (pixels per RML unit)"""
+        for level in reversed(self.levels):
+            if level.tolerance * scale <= 1.5:
+                return level
+        return self.levels[0]
+
+    def load_rml(self, rml_file_path, rapid_feed_speed):
+        """Rebuild the preview from a finished RML file (e.g. a cached result)"""
+        rapid_command = f"V{rapid_feed_speed / 60:.1f}"
+        header = ''.join(RML_HEADER)
+        rapid = False
+        rest = ''
+        with open(rml_file_path, 'r', encoding='utf-8') as f:
+            first = f.read(len(header))
+            rest = '' if first == header else first
+            for block in iter(lambda: f.read(1024 * 1024), ''):
+                commands = (rest + block).split(';')
+                rest = commands.pop()
+                for command in commands:
+                    if command[:1] == 'Z':
+                        x, y, _ = command[1:].split(',')
+                        self.add(int(x), int(y), rapid)
+                    elif command[:1] == 'V':
+                        rapid = command == rapid_command
+        self.finish()
+
+
+# ==================== Job Estimate ====================
+
+class JobEstimate:
+    """Path length, machining time and envelope of the generated moves
+
+    Fed with every move in RML units, so the envelope includes posOffset.
+    Without an acceleration a move takes its length over the speed of its V
+    command; with one, every move follows a trapezoidal speed profile
+    entering and leaving at the speed the corner to its neighbour allows,
+    settled once the next move is known.
+    """
+
+    START = (0, 0, 15500)  # where the RML header leaves the tool
+
+    def __init__(self, acceleration=0.0, work_area=None):
+        self.acceleration = acceleration  # mm/s², 0: constant speed
+        self.work_area = work_area  # (x, y, z) mm from the origin, 0: axis not checked
+        self.position = self.START
+        self.moves = 0
+        self.feeds = {}  # feed speed (mm/min) -> [length mm, time s] of cutting moves
+        self.rapid_length = 0.0
+        self.rapid_time = 0.0
+        self.lower = None  # envelope corners, RML units
+        self.upper = None
+        self.pending = None  # [length, speed, direction, entry speed, feed, rapid] of the last move
+        self.speeds = {}  # feed speed (mm/min) -> V command speed (mm/s)
+
+    def add(self, x, y, z, feed_speed, rapid=False):
+        """Add a move to (x, y, z) in RML units at feed_speed mm/min"""
+        self.moves += 1
+        lower = self.lower
+        if lower is None:
+            self.lower = [x, y, z]
+            self.upper = [x, y, z]
+        else:
+            upper = self.upper
+            if x < lower[0]:
+                lower[0] = x
+            elif x > upper[0]:
+                upper[0] = x
+            if y < lower[1]:
+                lower[1] = y
+            elif y > upper[1]:
+                upper[1] = y
+            if z < lower[2]:
+                lower[2] = z
+            elif z > upper[2]:
+                upper[2] = z
+
+        px, py, pz = self.position
+        dx = x - px
+        dy = y - py
+        dz = z - pz
+        self.position = (x, y, z)
+        units = math.sqrt(dx * dx + dy * dy + dz * dz)
+        if not units:
+            return
+        length = units / 100.0
+        speed = self.speed(feed_speed)
+        if speed <= 0:
+            # No feed: the distance counts, the time cannot be known
+            self.settle(0.0)
+            self.account(length, 0.0, feed_speed, rapid)
+            return
+        if not self.acceleration:
+            self.account(length, length / speed, feed_speed, rapid)
+            return
+
+        direction = (dx / units, dy / units, dz / units)
+        entry = 0.0
+        pending = self.pending
+        if pending is not None:
+            # Corner speed: full speed straight on, stopping at right angles and sharper
+            previous = pending[2]
+            cosine = previous[0] * direction[0] + previous[1] * direction[1] + previous[2] * direction[2]
+            entry = min(pending[1], speed) * max(0.0, cosine)
+            entry = min(entry, math.sqrt(pending[3] ** 2 + 2 * self.acceleration * pending[0]))
+            self.settle(entry)
+        self.pending = [length, speed, direction, entry, feed_speed, rapid]
+
+    def add_path(self, xs, ys, zs, feed_speed, rapid=False):
+        """Add consecutive moves given as integer NumPy arrays in RML units"""
+        if self.acceleration or feed_speed <= 0 or not len(xs):
+            # Corner speeds depend on every move in turn
+            for x, y, z in zip(xs.tolist(), ys.tolist(), zs.tolist()):
+                self.add(x, y, z, feed_speed, rapid)
+            return
+
+        px, py, pz = self.position
+        dx = np.diff(xs, prepend=px)
+        dy = np.diff(ys, prepend=py)
+        dz = np.diff(zs, prepend=pz)
+        length = float(np.sqrt(dx * dx + dy * dy + dz * dz).sum()) / 100.0
+        self.account(length, length / self.speed(feed_speed), feed_speed, rapid)
+        self.moves += len(xs)
+        self.position = (int(xs[-1]), int(ys[-1]), int(zs[-1]))
+
+        lower = [int(xs.min()), int(ys.min()), int(zs.min())]
+        upper = [int(xs.max()), int(ys.max()), int(zs.max())]
+        if self.lower is None:
+            self.lower, self.upper = lower, upper
+        else:
+            self.lower = [min(a, b) for a, b in zip(self.lower, lower)]
+            self.upper = [max(a, b) for a, b in zip(self.upper, upper)]
+
+    def speed(self, feed_speed):
+        """Speed in mm/s the machine runs at, as rounded in the V command"""
+        speed = self.speeds.get(feed_speed)
+        if speed is None:
+            speed = self.speeds[feed_speed] = float(f"{feed_speed / 60:.1f}")
+        return speed
+
+    def settle(self, exit_speed):
+        """Account the time of the pending move now that its exit speed is known"""
+        pending = self.pending
+        if pending is None:
+            return
+        length, speed, _, entry, feed_speed, rapid = pending
+        self.account(length, self.profile_time(length, entry, exit_speed, speed, self.acceleration),
+                     feed_speed, rapid)
+        self.pending = None
+
+    @staticmethod
+    def profile_time(length, entry, exit_speed, speed, acceleration):
+        """Time over length accelerating from entry towards speed and braking to exit_speed"""
+        accelerating = (speed * speed - entry * entry) / (2 * acceleration)
+        braking = (speed * speed - exit_speed * exit_speed) / (2 * acceleration)
+        if accelerating + braking <= length:
+            return ((speed - entry) + (speed - exit_speed)) / acceleration + \
+                (length - accelerating - braking) / speed
+        peak = math.sqrt((2 * acceleration * length + entry * entry + exit_speed * exit_speed) / 2)
+        if peak < max(entry, exit_speed):
+            # Too short to brake as asked: assume an even change of speed
+            return 2 * length / (entry + exit_speed)
+        return (2 * peak - entry - exit_speed) / acceleration
+
+    def account(self, length, time_s, feed_speed, rapid):
+        if rapid:
+            self.rapid_length += length
+            self.rapid_time += time_s
+        else:
+            totals = self.feeds.setdefault(feed_speed, [0.0, 0.0])
+            totals[0] += length
+            totals[1] += time_s
+
+    def finish(self):
+        """The tool stops after the last move"""
+        self.settle(0.0)
+
+    @property
+    def cutting_length(self):
+        return sum(length for length, _ in self.feeds.values())
+
+    @property
+    def cutting_time(self):
+        return sum(time_s for _, time_s in self.feeds.values())
+
+    @property
+    def total_time(self):
+        return self.cutting_time + self.rapid_time
+
+    def envelope(self):
+        """Lower and upper corner of the moves in mm, or None without moves"""
+        if self.lower is None:
+            return None
+        return [value / 100.0 for value in self.lower], [value / 100.0 for value in self.upper]
+
+    def exceeded_axes(self):
+        """Axes on which the envelope leaves the work area"""
+        envelope = self.envelope()
+        if envelope is None or not self.work_area:
+            return []
+        lower, upper = envelope
+        return [axis for axis, low, high, size in zip("XYZ", lower, upper, self.work_area)
+                if size and (low < 0 or high > size)]
+
+    @staticmethod
+    def format_duration(seconds):
+        seconds = int(seconds + 0.5)
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+    def as_dict(self):
+        envelope = self.envelope()
+        return {
+            "moves": self.moves,
+            "time_s": self.total_time,
+            "cutting_time_s": self.cutting_time,
+            "rapid_time_s": self.rapid_time,
+            "cutting_length_mm": self.cutting_length,
+            "rapid_length_mm": self.rapid_length,
+            "feeds": {f"{feed:g}": {"length_mm": length, "time_s": time_s}
+                      for feed, (length, time_s) in sorted(self.feeds.items())},
+            "envelope_mm": {"min": envelope[0], "max": envelope[1]} if envelope else None,
+            "exceeds_work_area": self.exceeded_axes(),
+            "acceleration": self.acceleration,
+        }
+
+    def report(self):
+        duration = self.format_duration
+        lines = [f"Estimated machining time: {duration(self.total_time)} "
+                 f"(cutting {duration(self.cutting_time)}, rapids {duration(self.rapid_time)})",
+                 f"  Path length: {self.cutting_length:.1f} mm cutting, {self.rapid_length:.1f} mm rapids"]
+        for feed, (length, time_s) in sorted(self.feeds.items()):
+            lines.append(f"  F{feed:g}: {length:.1f} mm, {duration(time_s)}")
+        envelope = self.envelope()
+        if envelope:
+            lower, upper = envelope
+            ranges = ", ".join(f"{axis} {low:.2f}..{high:.2f}" for axis, low, high in zip("XYZ", lower, upper))
+            sizes = " x ".join(f"{high - low:.2f}" for low, high in zip(lower, upper))
+            lines.append(f"  Envelope: {ranges} mm ({sizes} mm)")
+        exceeded = self.exceeded_axes()
+        if exceeded:
+            lines.append(f"  Warning: the job leaves the work area on {', '.join(exceeded)}")
+        return "\n".join(lines)
+
+    def load_rml(self, rml_file_path, rapid_feed_speed):
+        """Rebuild the estimate from a finished RML file (e.g. a cached result)"""
+        rapid_command = f"V{rapid_feed_speed / 60:.1f}"
+        header = ''.join(RML_HEADER)
+        feed_speed = 0.0
+        rapid = False
+        with open(rml_file_path, 'r', encoding='utf-8') as f:
+            first = f.read(len(header))
+            rest = '' if first == header else first
+            for block in iter(lambda: f.read(1024 * 1024), ''):
+                commands = (rest + block).split(';')
+                rest = commands.pop()
+                for command in commands:
+                    if command[:1] == 'Z':
+                        x, y, z = command[1:].split(',')
+                        self.add(int(x), int(y), int(z), feed_speed, rapid)
+                    elif command[:1] == 'V':
+                        feed_speed = float(command[1:]) * 60
+                        rapid = command == rapid_command
+        self.finish()
+
+
+# ==================== Job Queue ====================
+
+class JobCancelled(Exception):
+    pass
+
+
+def convert_queued(job_id, input_path, output_path, setting_file, options, cache, progress, cancel):
+    """Convert one queued job with a fresh converter (runs inside a worker process)
+
+    Progress goes to the shared progress queue as (job_id, percent); setting
+    the cancel event stops the conversion at its next progress report,
+    leaving any previous output file untouched.
+    """
+    converter = GCode2RMLConverter()
+    converter.overrides = options
+    converter.cache = cache
+    converter.progress_step = JobQueue.PROGRESS_STEP
+    messages = []
+    converter.callback_log = messages.append
+
+    def report(value):
+        if cancel.is_set():
+            raise JobCancelled("Cancelled")
+        progress.put((job_id, value))
+
+    converter.callback_progress = report
+    try:
+        success = converter.convert(input_path, output_path, setting_file)
+    except Exception as e:
+        messages.append(f"Error: {e}")
+        success = False
+    return success and not cancel.is_set(), messages
+
+
+class QueuedJob:
+    """A conversion waiting in or run by a JobQueue"""
+
+    def __init__(self, job_id, input_path, output_path):
+        self.job_id = job_id
+        self.input_path = input_path
+        self.output_path = output_path
+        self.status = "Pending"  # Pending / Running / Done / Failed / Cancelled
+        self.progress = 0.0
+        self.messages = []
+        self.cancel = None  # manager Event while running
+
+    @property
+    def finished(self):
+        return self.status in ("Done", "Failed", "Cancelled")
+
+
+class JobQueue:
+    """Runs queued conversions on a process pool, each with a fresh converter
+
+    Pending jobs start in list order whenever a worker is free, so moving a
+    job up gives it priority. Workers report progress through a manager
+    queue and poll a per-job cancel event. Completions are collected by
+    poll(), so the job list is only changed by the thread calling it.
+    """
+
+    PROGRESS_STEP = 1.0  # % between progress reports of a job
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.jobs = []
+        self.next_id = 0
+        self.pool = None
+        self.manager = None
+        self.progress = None
+        self.completed = queue.Queue()  # (job, future) from the pool's callback threads
+
+    def add(self, input_path, output_path):
+        job = QueuedJob(self.next_id, input_path, output_path)
+        self.next_id += 1
+        self.jobs.append(job)
+        return job
+
+    def get(self, job_id):
+        for job in self.jobs:
+            if job.job_id == job_id:
+                return job
+        return None
+
+    def pending(self):
+        return [job for job in self.jobs if job.status == "Pending"]
+
+    def running(self):
+        return [job for job in self.jobs if job.status == "Running"]
+
+    def move(self, job, offset):
+        """Move a pending job up (negative offset) or down among the pending jobs"""
+        pending = self.pending()
+        if job not in pending:
+            return False
+        index = pending.index(job) + offset
+        if not 0 <= index < len(pending):
+            return False
+        other = pending[index]
+        a, b = self.jobs.index(job), self.jobs.index(other)
+        self.jobs[a], self.jobs[b] = other, job
+        return True
+
+    def cancel(self, job):
+        if job.status == "Pending":
+            job.status = "Cancelled"
+        elif job.status == "Running":
+            job.cancel.set()
+
+    def remove_finished(self):
+        self.jobs = [job for job in self.jobs if not job.finished]
+
+    def start(self, setting_file=None, options=None, cache=None):
+        """Start pending jobs on free workers, returning the started jobs"""
+        started = []
+        free = self.workers - len(self.running())
+        for job in self.pending()[:max(0, free)]:
+            if self.pool is None:
+                self.manager = multiprocessing.Manager()
+                self.progress = self.manager.Queue()
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            job.status = "Running"
+            job.cancel = self.manager.Event()
+            future = self.pool.submit(convert_queued, job.job_id, job.input_path, job.output_path,
+                                      setting_file, options or {}, cache, self.progress, job.cancel)
+            future.add_done_callback(lambda future, job=job: self.completed.put((job, future)))
+            started.append(job)
+        return started
+
+    def poll(self):
+        """Apply reported progress and completions, returning the changed jobs"""
+        changed = []
+        if self.progress is not None:
+            try:
+                while True:
+                    job_id, value = self.progress.get_nowait()
+                    job = self.get(job_id)
+                    if job is not None and job.status == "Running":
+                        job.progress = value
+                        if job not in changed:
+                            changed.append(job)
+            except queue.Empty:
+                pass
+        try:
+            while True:
+                job, future = self.completed.get_nowait()
+                try:
+                    success, job.messages = future.result()
+                except Exception as e:
+                    success, job.messages = False, [f"Error: {e}"]
+                if job.cancel.is_set():
+                    job.status = "Cancelled"
+                else:
+                    job.status = "Done" if success else "Failed"
+                    job.progress = 100.0 if success else job.progress
+                job.cancel = None
+                if job not in changed:
+                    changed.append(job)
+        except queue.Empty:
+            pass
+        return changed
+
+    def shutdown(self):
+        for job in self.jobs:
+            if job.status == "Running":
+                job.cancel.set()
+            elif job.status == "Pending":
+                job.status = "Cancelled"
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.manager.shutdown()
+            self.pool = None
+            self.manager = None
+            self.progress = None
+
+
+# ==================== Graphical User Interface ====================
+
+class ToolpathCanvas:
+    """Canvas drawing a ToolpathPreview: drag to pan, wheel to zoom, double-click to fit"""
+
+    RAPID_COLOR = "#e07020"
+    FEED_COLOR = "#2060c0"
+    MAX_POINTS = 60000  # points drawn per redraw
+    REFRESH_S = 0.5  # minimum interval between redraws while the preview grows
+
+    def __init__(self, parent):
+        self.canvas = tk.Canvas(parent, bg="white", highlightthickness=0)
+        self.preview = None
+        self.scale = 1.0  # pixels per RML unit
+        self.origin = (0.0, 0.0)  # RML coordinates at the bottom left corner
+        self.auto_fit = True  # follow the growing toolpath until the view is moved
+        self.drag = None
+        self.drawn_moves = -1
+        self.drawn_at = 0.0
+
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<ButtonPress-1>", self.start_drag)
+        self.canvas.bind("<B1-Motion>", self.pan)
+        self.canvas.bind("<Double-Button-1>", self.fit_view)
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom(event, 1.25 if event.delta > 0 else 0.8))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom(event, 1.25))
+        self.canvas.bind("<Button-5>", lambda event: self.zoom(event, 0.8))
+
+    def set_preview(self, preview):
+        self.preview = preview
+        self.auto_fit = True
+        self.redraw()
+
+    def refresh(self):
+        """Redraw if the preview grew, at most every REFRESH_S seconds"""
+        if (self.preview is not None and self.preview.moves != self.drawn_moves and
+                time.monotonic() - self.drawn_at >= self.REFRESH_S):
+            self.redraw()
+
+    def fit(self):
+        min_x, min_y, max_x, max_y = self.preview.bounds
+        width = max(self.canvas.winfo_width() - 20, 1)
+        height = max(self.canvas.winfo_height() - 20, 1)
+        self.scale = min(width / max(max_x - min_x, 1), height / max(max_y - min_y, 1))
+        self.origin = ((min_x + max_x) / 2 - (width + 20) / 2 / self.scale,
+                       (min_y + max_y) / 2 - (height + 20) / 2 / self.scale)
+
+    def fit_view(self, event=None):
+        self.auto_fit = True
+        self.redraw()
+
+    def start_drag(self, event):
+        self.drag = (event.x, event.y)
+
+    def pan(self, event):
+        if self.drag is None:
+            return
+        origin_x, origin_y = self.origin
+        self.origin = (origin_x - (event.x - self.drag[0]) / self.scale,
+                       origin_y + (event.y - self.drag[1]) / self.scale)
+        self.drag = (event.x, event.y)
+        self.auto_fit = False
+        self.redraw()
+
+    def zoom(self, event, factor):
+        # Keep the point under the cursor in place
+        height = self.canvas.winfo_height()
+        x = self.origin[0] + event.x / self.scale
+        y = self.origin[1] + (height - event.y) / self.scale
+        self.scale *= factor
+        self.origin = (x - event.x / self.scale, y - (height - event.y) / self.scale)
+        self.auto_fit = False
+        self.redraw()
+
+    def redraw(self):
+        self.canvas.delete("all")
+        self.drawn_at = time.monotonic()
+        preview = self.preview
+        if preview is None or preview.bounds is None:
+            return
+        self.drawn_moves = preview.moves
+        if self.auto_fit:
+            self.fit()
+
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        scale = self.scale
+        origin_x, origin_y = self.origin
+        view = [int(origin_x) - 1, int(origin_y) - 1,
+                int(origin_x + width / scale) + 1, int(origin_y + height / scale) + 1]
+        level = preview.level_for(scale)
+        xs, ys, rapid = level.xs, level.ys, level.rapid
+        count = len(level)
+
+        budget = self.MAX_POINTS
+        for chunk in level.query(view):
+            # Start at the point before the chunk to connect it to the previous one
+            start = max(chunk * level.CHUNK - 1, 0)
+            end = min((chunk + 1) * level.CHUNK, count)
+            if end - start < 2:
+                continue
+            kind = rapid[start + 1]
+            coords = [(xs[start] - origin_x) * scale, height - (ys[start] - origin_y) * scale]
+            for index in range(start + 1, end):
+                point = [(xs[index] - origin_x) * scale, height - (ys[index] - origin_y) * scale]
+                if rapid[index] != kind:
+                    self.draw_run(coords, kind)
+                    coords = coords[-2:]
+                    kind = rapid[index]
+                coords += point
+            self.draw_run(coords, kind)
+            budget -= end - start
+            if budget <= 0:
+                break
+
+    def draw_run(self, coords, rapid):
+        if len(coords) >= 4:
+            self.canvas.create_line(coords, fill=self.RAPID_COLOR if rapid else self.FEED_COLOR)
+
+
+class GCodeConverterGUI:
+    # Interval between polls of the event queue filled by the worker thread
+    POLL_INTERVAL_MS = 100
+    # Minimum progress change (%) reported by the converter
+    PROGRESS_STEP = 0.5
+
+    def __init__(self):
+        self.window = tk.Tk()
+        self.window.title("G-code to RML-1 Converter")
+        self.window.geometry("1100x800")
+
+        # Worker threads never touch Tk: they post events polled by the main loop,
+        # tagged with the converter of their run
+        self.events = queue.Queue()
+        self.conversion_start = 0.0
+
+        # Every run gets a fresh converter, so no state carries over between jobs
+        self.converter = self.new_converter()  # of the latest run, the one shown by the status and preview
+        self.cache = ConversionCache()
+        self.job_queue = JobQueue()
+        self.streamer = None  # RMLStreamer while sending to the machine
+
+        self.create_widgets()
+        self.window.after(self.POLL_INTERVAL_MS, self.poll_events)
+
+    def new_converter(self):
+        converter = GCode2RMLConverter()
+        converter.callback_log = lambda message: self.events.put(("log", message))
+        converter.callback_progress = lambda value: self.events.put(
+            ("progress", converter, value, converter.lines_read))
+        converter.progress_step = self.PROGRESS_STEP
+        converter.collect_estimate = True
+        return converter
+
+    def create_widgets(self):
+        # File selection frame
+        file_frame = tk.Frame(self.window)
+        file_frame.pack(pady=10, padx=10, fill=tk.X)
+
+        # Input file
+        tk.Label(file_frame, text="Input G-code file:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.input_file_var = tk.StringVar()
+        tk.Entry(file_frame, textvariable=self.input_file_var, width=50).grid(row=0, column=1, padx=5)
+        tk.Button(file_frame, text="Browse...", command=self.browse_input_file).grid(row=0, column=2)
+
+        # Output file
+        tk.Label(file_frame, text="Output RML file:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.output_file_var = tk.StringVar()
+        tk.Entry(file_frame, textvariable=self.output_file_var, width=50).grid(row=1, column=1, padx=5)
+        tk.Button(file_frame, text="Browse...", command=self.browse_output_file).grid(row=1, column=2)
+
+        # Machine port for direct sending: device, baud rate and flow control
+        tk.Label(file_frame, text="Machine port:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.device_var = tk.StringVar()
+        tk.Entry(file_frame, textvariable=self.device_var, width=50).grid(row=2, column=1, padx=5)
+        port_frame = tk.Frame(file_frame)
+        port_frame.grid(row=2, column=2)
+        self.baud_var = tk.StringVar(value="9600")
+        tk.Entry(port_frame, textvariable=self.baud_var, width=7).pack(side=tk.LEFT)
+        self.flow_var = tk.StringVar(value="hardware")
+        ttk.Combobox(port_frame, textvariable=self.flow_var, values=RMLStreamer.FLOW_CONTROLS,
+                     width=9, state="readonly").pack(side=tk.LEFT, padx=2)
+
+        # Progress bar
+        self.progress_var = tk.DoubleVar()
+        self.progress_bar = ttk.Progressbar(self.window, variable=self.progress_var, maximum=100)
+        self.progress_bar.pack(pady=10, padx=10, fill=tk.X)
+
+        # Control buttons
+        button_frame = tk.Frame(self.window)
+        button_frame.pack(pady=10)
+
+        # Convert and Estimate are disabled while sending, the send owns the preview
+        self.convert_button = tk.Button(button_frame, text="Convert", command=self.start_conversion,
+                                        bg="lightblue", padx=20, pady=5)
+        self.convert_button.pack(side=tk.LEFT, padx=5)
+        self.estimate_button = tk.Button(button_frame, text="Estimate", command=self.start_estimate,
+                                         padx=10, pady=5)
+        self.estimate_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Send to Machine", command=self.start_sending,
+                  bg="lightgreen", padx=10, pady=5).pack(side=tk.LEFT, padx=5)
+        self.pause_button = tk.Button(button_frame, text="Pause", command=self.toggle_pause,
+                                      state=tk.DISABLED, padx=10, pady=5)
+        self.pause_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Clear Log", command=self.clear_log,
+                  bg="lightgray", padx=20, pady=5).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Clear Cache", command=self.clear_cache,
+                  bg="lightgray", padx=20, pady=5).pack(side=tk.LEFT, padx=5)
+        self.use_cache_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(button_frame, text="Use cache", variable=self.use_cache_var).pack(side=tk.LEFT, padx=5)
+        self.statistics_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(button_frame, text="Statistics", variable=self.statistics_var).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Exit", command=self.window.quit,
+                  bg="lightcoral", padx=20, pady=5).pack(side=tk.LEFT, padx=5)
+
+        # Job queue: files converted on a worker pool, each job with its own progress
+        queue_frame = tk.Frame(self.window)
+        queue_frame.pack(padx=10, fill=tk.X)
+        tk.Label(queue_frame, text="Job queue:").pack(anchor=tk.W)
+        self.queue_view = ttk.Treeview(queue_frame, columns=("status", "progress"), height=5)
+        self.queue_view.heading("#0", text="File")
+        self.queue_view.heading("status", text="Status")
+        self.queue_view.heading("progress", text="Progress")
+        self.queue_view.column("#0", width=600)
+        self.queue_view.column("status", width=100)
+        self.queue_view.column("progress", width=100)
+        self.queue_view.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        queue_buttons = tk.Frame(queue_frame)
+        queue_buttons.pack(side=tk.LEFT, padx=5)
+        for text, command in (("Add Files...", self.add_queue_files), ("Move Up", lambda: self.move_queued(-1)),
+                              ("Move Down", lambda: self.move_queued(1)), ("Cancel Job", self.cancel_queued),
+                              ("Clear Finished", self.clear_finished)):
+            tk.Button(queue_buttons, text=text, command=command, width=12).pack(pady=1)
+
+        # Log and toolpath preview side by side
+        panes = tk.PanedWindow(self.window, orient=tk.HORIZONTAL)
+        panes.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
+
+        log_frame = tk.Frame(panes)
+        tk.Label(log_frame, text="Execution log:").pack(anchor=tk.W)
+        self.log_text = scrolledtext.ScrolledText(log_frame, height=15, width=60)
+        self.log_text.pack(fill=tk.BOTH, expand=True)
+        panes.add(log_frame)
+
+        preview_frame = tk.Frame(panes)
+        tk.Label(preview_frame, text="Toolpath preview (feeds blue, rapids orange):").pack(anchor=tk.W)
+        self.preview_canvas = ToolpathCanvas(preview_frame)
+        self.preview_canvas.canvas.pack(fill=tk.BOTH, expand=True)
+        panes.add(preview_frame)
+
+        # Status
+        self.status_var = tk.StringVar(value="Ready")
+        status_bar = tk.Label(self.window, textvariable=self.status_var,
+                              relief=tk.SUNKEN, anchor=tk.W)
+        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+
+    def browse_input_file(self):
+        filename = filedialog.askopenfilename(
+            title="Select G-code file",
+            filetypes=[("G-code files", "*.nc;*.cnc;*.gcode;*.txt"), ("All files", "*.*")]
+        )
+        if filename:
+            self.input_file_var.set(filename)
+            # Auto-generate output filename
+            base = os.path.splitext(filename)[0]
+            self.output_file_var.set(base + ".rml")
+
+    def browse_output_file(self):
+        filename = filedialog.asksaveasfilename(
+            title="Save RML file as",
+            defaultextension=".rml",
+            filetypes=[("RML files", "*.rml"), ("All files", "*.*")]
+        )
+        if filename:
+            self.output_file_var.set(filename)
+
+    def poll_events(self):
+        """Apply events posted by the worker thread, then reschedule"""
+        progress = None
+        try:
+            while True:
+                event = self.events.get_nowait()
+                if event[0] == "progress":
+                    if event[1] is self.converter:
+                        progress = event  # only the latest progress of the latest run is drawn
+                elif event[0] == "log":
+                    self.log_message(event[1])
+                else:
+                    # The end of a run: its last progress goes first, the final status stays
+                    if progress:
+                        self.update_progress(progress[2], progress[3])
+                        progress = None
+                    if event[0] == "done":
+                        self.conversion_done(event[1], event[2])
+                    elif event[0] == "sent":
+                        self.sending_done(event[1], event[2], event[3])
+                    elif event[0] == "estimated":
+                        self.estimate_done(event[1], event[2])
+        except queue.Empty:
+            pass
+        if progress:
+            self.update_progress(progress[2], progress[3])
+        self.update_queue()
+        self.preview_canvas.refresh()
+        self.window.after(self.POLL_INTERVAL_MS, self.poll_events)
+
+    def log_message(self, message):
+        self.log_text.insert(tk.END, message + "\n")
+        self.log_text.see(tk.END)
+
+    def update_progress(self, value, lines_read=0):
+        self.progress_var.set(value)
+        status = f"Progress: {value:.1f}%"
+        elapsed = time.monotonic() - self.conversion_start
+        if elapsed > 0 and lines_read:
+            status += f" - {lines_read / elapsed:.0f} lines/s"
+        if 0 < value < 100:
+            eta = elapsed * (100 - value) / value
+            status += f" - ETA {int(eta // 60)}:{int(eta % 60):02d}"
+        self.status_var.set(status)
+
+    def add_queue_files(self):
+        filenames = filedialog.askopenfilenames(
+            title="Add G-code files to the queue",
+            filetypes=[("G-code files", "*.nc;*.cnc;*.gcode;*.txt"), ("All files", "*.*")]
+        )
+        for filename in filenames:
+            job = self.job_queue.add(filename, os.path.splitext(filename)[0] + ".rml")
+            self.queue_view.insert("", tk.END, iid=str(job.job_id), text=filename, values=(job.status, ""))
+
+    def selected_jobs(self):
+        return [job for job in map(self.job_queue.get, map(int, self.queue_view.selection())) if job]
+
+    def move_queued(self, offset):
+        for job in self.selected_jobs():
+            if self.job_queue.move(job, offset):
+                self.queue_view.move(str(job.job_id), "", self.job_queue.jobs.index(job))
+
+    def cancel_queued(self):
+        for job in self.selected_jobs():
+            self.job_queue.cancel(job)
+            self.show_job(job)
+
+    def clear_finished(self):
+        for job in self.job_queue.jobs:
+            if job.finished:
+                self.queue_view.delete(str(job.job_id))
+        self.job_queue.remove_finished()
+
+    def show_job(self, job):
+        progress = f"{job.progress:.0f}%" if job.status in ("Running", "Done") else ""
+        self.queue_view.item(str(job.job_id), values=(job.status, progress))
+
+    def update_queue(self):
+        """Show the progress of queued jobs, log finished ones and start pending ones on free workers"""
+        for job in self.job_queue.poll():
+            self.show_job(job)
+            if job.finished:
+                self.log_message(f"[{os.path.basename(job.input_path)}] {job.status}")
+                for message in job.messages:
+                    self.log_message("    " + message.replace("\n", "\n    "))
+        if not self.job_queue.pending():
+            return
+        options = {"collect_estimate": True, "collect_stats": self.statistics_var.get()}
+        cache = self.cache if self.use_cache_var.get() else None
+        for job in self.job_queue.start(options=options, cache=cache):
+            self.show_job(job)
+
+    def clear_log(self):
+        self.log_text.delete(1.0, tk.END)
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.log_message(f"Cache cleared: {self.cache.directory}")
+
+    def conversion_thread(self, converter, input_file, output_file):
+        try:
+            success = converter.convert(input_file, output_file)
+        except Exception as e:
+            self.events.put(("log", f"Error: {e}"))
+            success = False
+        self.events.put(("done", converter, success))
+
+    def estimate_thread(self, converter, input_file):
+        try:
+            success = converter.estimate_job(input_file)
+        except Exception as e:
+            self.events.put(("log", f"Error: {e}"))
+            success = False
+        self.events.put(("estimated", converter, success))
+
+    def sending_thread(self, converter, input_file, streamer):
+        try:
+            success = converter.send(input_file, streamer)
+        except Exception as e:
+            self.events.put(("log", f"Error: {e}"))
+            success = False
+        self.events.put(("sent", converter, streamer, success))
+
+    def toggle_pause(self):
+        if self.streamer is None:
+            return
+        if self.streamer.paused:
+            self.streamer.resume()
+            self.pause_button.config(text="Pause")
+            self.log_message("Transmission resumed")
+        else:
+            self.streamer.pause()
+            self.pause_button.config(text="Resume")
+            self.log_message("Transmission paused")
+
+    def conversion_done(self, converter, success):
+        if converter is not self.converter:
+            return  # an earlier run, superseded in the status and preview; its log is shown
+        self.preview_canvas.redraw()
+        if success:
+            self.status_var.set("Conversion completed successfully!")
+            messagebox.showinfo("Success", "Conversion completed successfully!")
+        else:
+            self.status_var.set("Conversion error!")
+
+    def sending_done(self, converter, streamer, success):
+        if streamer is self.streamer:
+            self.streamer = None
+            self.pause_button.config(text="Pause", state=tk.DISABLED)
+            self.convert_button.config(state=tk.NORMAL)
+            self.estimate_button.config(state=tk.NORMAL)
+        if converter is not self.converter:
+            return
+        self.preview_canvas.redraw()
+        self.status_var.set("Transmission completed!" if success else "Transmission error!")
+
+    def estimate_done(self, converter, success):
+        if converter is not self.converter:
+            return
+        estimate = converter.estimate
+        if not success or estimate is None:
+            self.status_var.set("Estimate error!")
+            return
+        status = f"Estimated machining time: {estimate.format_duration(estimate.total_time)}"
+        if estimate.exceeded_axes():
+            status += f" - leaves the work area on {', '.join(estimate.exceeded_axes())}"
+        self.status_var.set(status)
+
+    def start_conversion(self):
+        input_file = self.input_file_var.get()
+        output_file = self.output_file_var.get()
+
+        if not input_file:
+            messagebox.showerror("Error", "Select input file!")
+            return
+
+        if not output_file:
+            messagebox.showerror("Error", "Select output file!")
+            return
+
+        self.converter = self.new_converter()
+        self.converter.cache = self.cache if self.use_cache_var.get() else None
+        self.converter.collect_stats = self.statistics_var.get()
+        self.start_preview()
+
+        # Run in separate thread to avoid blocking GUI
+        self.conversion_start = time.monotonic()
+        thread = threading.Thread(target=self.conversion_thread, args=(self.converter, input_file, output_file))
+        thread.daemon = True
+        thread.start()
+
+    def start_estimate(self):
+        input_file = self.input_file_var.get()
+
+        if not input_file:
+            messagebox.showerror("Error", "Select input file!")
+            return
+
+        self.converter = self.new_converter()
+        self.converter.collect_stats = self.statistics_var.get()
+
+        # Estimate in a separate thread: no RML is generated, only the moves are measured
+        thread = threading.Thread(target=self.estimate_thread, args=(self.converter, input_file))
+        thread.daemon = True
+        thread.start()
+
+    def start_preview(self):
+        """Give the converter a fresh preview, drawn while it fills"""
+        preview = ToolpathPreview()
+        self.converter.preview = preview
+        self.preview_canvas.set_preview(preview)
+
+    def start_sending(self):
+        input_file = self.input_file_var.get()
+        device = self.device_var.get()
+
+        if not input_file:
+            messagebox.showerror("Error", "Select input file!")
+            return
+
+        if not device:
+            messagebox.showerror("Error", "Enter the machine port!")
+            return
+
+        try:
+            baudrate = int(self.baud_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Invalid baud rate!")
+            return
+
+        if self.streamer is not None:
+            messagebox.showerror("Error", "Already sending!")
+            return
+
+        self.converter = self.new_converter()
+        self.converter.collect_stats = self.statistics_var.get()
+        self.start_preview()
+        self.streamer = RMLStreamer(device, baudrate, self.flow_var.get())
+        self.pause_button.config(state=tk.NORMAL)
+        self.convert_button.config(state=tk.DISABLED)
+        self.estimate_button.config(state=tk.DISABLED)
+
+        # Convert and send in a separate thread: the machine starts on the first commands
+        self.conversion_start = time.monotonic()
+        thread = threading.Thread(target=self.sending_thread, args=(self.converter, input_file, self.streamer))
+        thread.daemon = True
+        thread.start()
+
+    def run(self):
+        try:
+            self.window.mainloop()
+        finally:
+            self.job_queue.shutdown()
+
+
+# ==================== Command Line Interface ====================
+
+def convert_file(job):
+    """Convert one file with a fresh converter (runs inside a worker process)"""
+    input_path, output_path, setting_file, options, cache, save_ir, split, profile = job
+    converter = GCode2RMLConverter()
+    converter.overrides = options
+    converter.cache = cache
+    messages = []
+    converter.callback_log = messages.append
+
+    profiler = cProfile.Profile() if profile else None
+    start = time.perf_counter()
+    try:
+        if profiler:
+            profiler.enable()
+        if input_path.endswith(IR_EXTENSION):
+            # Re-emit a compiled program under the current settings
+            program = CompiledProgram.load(input_path)
+            success = converter.emit_program(program, output_path, setting_file)
+        elif save_ir:
+            # Settings first, so the statistics cover compiling too
+            converter.load_settings(setting_file)
+            program = converter.compile(input_path)
+            success = program is not None and converter.emit_loaded_program(program, output_path)
+            if success:
+                program.save(os.path.splitext(output_path)[0] + IR_EXTENSION)
+        elif split:
+            success = converter.convert_chunked(input_path, output_path, setting_file, split)
+        else:
+            success = converter.convert(input_path, output_path, setting_file)
+    except Exception as e:
+        messages.append(f"Error: {e}")
+        success = False
+    finally:
+        if profiler:
+            profiler.disable()
+    elapsed = time.perf_counter() - start
+
+    if profiler:
+        profile_path = output_path + ".prof"
+        try:
+            profiler.dump_stats(profile_path)
+            messages.append(f"Profile saved: {profile_path}")
+        except OSError as e:
+            messages.append(f"Could not save profile: {e}")
+    stats = converter.stats.as_dict() if success and converter.stats else None
+    return input_path, output_path, success, elapsed, messages, stats
+
+
+def expand_inputs(patterns):
+    """Expand file names and glob patterns, keeping order and dropping duplicates"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def output_path_for(input_path, output_dir=None):
+    """Output file name: same base name with the .rml extension"""
+    base = os.path.splitext(input_path)[0]
+    if output_dir:
+        base = os.path.join(output_dir, os.path.basename(base))
+    return base + ".rml"
+
+
+def send_file(inputs, args, options):
+    """Stream a single input to args.device, returning the exit status"""
+    if len(inputs) != 1:
+        print("--device streams exactly one input file")
+        return 1
+    converter = GCode2RMLConverter()
+    converter.overrides = options
+    messages = []
+    converter.callback_log = print if args.verbose else messages.append
+    streamer = RMLStreamer(args.device, args.baud, args.flow)
+
+    start = time.perf_counter()
+    success = converter.send(inputs[0], streamer, args.settings)
+    status = "OK" if success else "FAILED"
+    print(f"{status:<6} {time.perf_counter() - start:8.2f}s  {inputs[0]} -> {args.device}")
+    if not success:
+        for message in messages:
+            print("        " + message.replace("\n", "\n        "))
+    return 0 if success else 1
+
+
+def estimate_file(job):
+    """Estimate one file with a fresh converter (runs inside a worker process)"""
+    input_path, setting_file, options = job
+    converter = GCode2RMLConverter()
+    converter.overrides = options
+    messages = []
+    converter.callback_log = messages.append
+
+    start = time.perf_counter()
+    try:
+        success = converter.estimate_job(input_path, setting_file)
+    except Exception as e:
+        messages.append(f"Error: {e}")
+        success = False
+    elapsed = time.perf_counter() - start
+    estimate = converter.estimate.as_dict() if success else None
+    return input_path, success, elapsed, messages, estimate
+
+
+def estimate_files(inputs, args, options):
+    """Print the machining time and envelope of every input without converting, returning the exit status"""
+    jobs = [(path, args.settings, options) for path in inputs]
+    workers = max(1, min(args.jobs, len(jobs)))
+
+    start = time.perf_counter()
+    failed = 0
+    total_time = 0.0
+    if workers == 1:
+        results = map(estimate_file, jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(estimate_file, jobs)
+    try:
+        for input_path, success, elapsed, messages, estimate in results:
+            if success:
+                total_time += estimate["time_s"]
+                summary = JobEstimate.format_duration(estimate["time_s"])
+                if estimate["envelope_mm"]:
+                    lower, upper = estimate["envelope_mm"]["min"], estimate["envelope_mm"]["max"]
+                    summary += ", " + " x ".join(f"{high - low:.2f}" for low, high in zip(lower, upper)) + " mm"
+                if estimate["exceeds_work_area"]:
+                    summary += f", exceeds the work area on {', '.join(estimate['exceeds_work_area'])}"
+                print(f"{'OK':<6} {elapsed:8.2f}s  {input_path}: {summary}")
+            else:
+                failed += 1
+                print(f"{'FAILED':<6} {elapsed:8.2f}s  {input_path}")
+            if args.verbose or not success:
+                for message in messages:
+                    print("        " + message.replace("\n", "\n        "))
+            if estimate and args.stats:
+                print("        " + json.dumps(estimate, indent=2).replace("\n", "\n        "))
+    finally:
+        if workers > 1:
+            pool.shutdown()
+
+    print(f"{len(jobs) - failed}/{len(jobs)} files estimated in {time.perf_counter() - start:.2f}s, "
+          f"total machining time {JobEstimate.format_duration(total_time)}")
+    return 1 if failed else 0
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Convert G-code files to Roland RML-1 without the GUI")
+    parser.add_argument("inputs", nargs="*", help="input G-code files or glob patterns")
+    parser.add_argument("-o", "--output-dir", help="directory for .rml files (default: next to each input)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("-s", "--settings", default=DEFAULT_SETTING_FILE, help="path to setting.txt")
+    parser.add_argument("--arc-engine", choices=["auto", "python", "numpy"], default="auto",
+                        help="arc tessellation engine (default: numpy when installed)")
+    parser.add_argument("--compact", type=float, metavar="TOLERANCE",
+                        help="drop duplicate and collinear moves within TOLERANCE mm")
+    parser.add_argument("--fixed-point", action="store_true",
+                        help="track coordinates as exact integers and round negative values symmetrically")
+    parser.add_argument("--optimize-rapids", action="store_true",
+                        help="reorder cut segments to shorten the rapid travel between them")
+    parser.add_argument("--safe-z", type=float, metavar="Z",
+                        help="rapid height separating cut segments for --optimize-rapids (default: detected)")
+    parser.add_argument("--save-ir", action="store_true",
+                        help=f"also save the parsed program as {IR_EXTENSION}; pass {IR_EXTENSION} files as "
+                             f"inputs to re-emit them with new settings without reparsing")
+    parser.add_argument("--incremental", action="store_true",
+                        help="save modal-state checkpoints and, on reconversion, redo only the changed tail")
+    parser.add_argument("--split", action="store_true",
+                        help="convert each file in parallel chunks using --jobs workers, for very large files "
+                             "(bypasses the result cache and --incremental)")
+    parser.add_argument("--device", help="stream the RML of a single input to this serial port or device file "
+                                         "while converting, instead of writing an .rml file")
+    parser.add_argument("--baud", type=int, default=9600, help="serial baud rate for --device (default: 9600)")
+    parser.add_argument("--flow", choices=RMLStreamer.FLOW_CONTROLS, default="hardware",
+                        help="serial flow control for --device (default: hardware RTS/CTS)")
+    parser.add_argument("--estimate", action="store_true",
+                        help="only estimate the machining time and envelope of every input, without writing RML")
+    parser.add_argument("--acceleration", type=float, metavar="MM_S2",
+                        help="machine acceleration for time estimates (default: acceleration in setting.txt)")
+    parser.add_argument("--watch", action="append", metavar="DIR",
+                        help="watch DIR (repeatable) and convert new or changed G-code files as they arrive, "
+                             "using --jobs workers, until interrupted")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH,
+                        help="index of files processed by --watch, so restarts skip finished work")
+    parser.add_argument("--settle", type=float, default=2.0, metavar="SECONDS",
+                        help="time a file must stay unchanged before --watch converts it (default: 2)")
+    parser.add_argument("--no-cache", action="store_true", help="always convert, bypassing the result cache")
+    parser.add_argument("--clear-cache", action="store_true", help="empty the result cache before converting")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="result cache directory")
+    parser.add_argument("--cache-size", type=float, default=DEFAULT_CACHE_SIZE / (1024 * 1024),
+                        help="result cache size limit in MB")
+    parser.add_argument("--stats", action="store_true",
+                        help="print per-stage timings and input counts of every file as JSON")
+    parser.add_argument("--profile", action="store_true",
+                        help="run each conversion under cProfile, saving the profile next to the output as .prof")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the converter log of every file")
+    args = parser.parse_args(argv)
+
+    options = {}
+    if args.arc_engine == "numpy" and np is None:
+        parser.error("--arc-engine numpy requires NumPy to be installed")
+    if args.arc_engine != "auto":
+        options["arc_engine"] = args.arc_engine
+
+    if args.incremental:
+        options["incremental"] = True
+    if args.compact is not None:
+        options["compact_moves"] = True
+        options["compact_tolerance"] = args.compact
+    if args.stats:
+        options["collect_stats"] = True
+    if args.fixed_point:
+        options["fixed_point"] = True
+    if args.optimize_rapids:
+        options["optimize_rapids"] = True
+    if args.safe_z is not None:
+        options["safe_z"] = args.safe_z
+    if args.acceleration is not None:
+        options["acceleration"] = args.acceleration
+
+    cache = ConversionCache(args.cache_dir, int(args.cache_size * 1024 * 1024))
+    if args.clear_cache:
+        cache.clear()
+    if args.no_cache:
+        cache = None
+
+    if args.watch:
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+        watcher = HotFolderWatcher(args.watch, args.output_dir, args.settings, options, cache, args.jobs,
+                                   args.index, args.settle)
+        watcher.run()
+        return 0
+
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        if args.clear_cache:
+            print(f"Cache cleared: {args.cache_dir}")
+            return 0
+        print("No input files found")
+        return 1
+    if args.estimate:
+        return estimate_files(inputs, args, options)
+    if args.device:
+        return send_file(inputs, args, options)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    split = max(1, args.jobs) if args.split else 0
+    jobs = [(path, output_path_for(path, args.output_dir), args.settings, options, cache, args.save_ir, split,
+             args.profile) for path in inputs]
+    # With --split the workers convert chunks of one file at a time
+    workers = 1 if split else max(1, min(args.jobs, len(jobs)))
+
+    start = time.perf_counter()
+    failed = 0
+    if workers == 1:
+        results = map(convert_file, jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(convert_file, jobs)
+    try:
+        for input_path, output_path, success, elapsed, messages, stats in results:
+            status = "OK" if success else "FAILED"
+            if not success:
+                failed += 1
+            print(f"{status:<6} {elapsed:8.2f}s  {input_path} -> {output_path}")
+            if args.verbose or not success:
+                for message in messages:
+                    print("        " + message.replace("\n", "\n        "))
+            if stats:
+                print("        " + json.dumps(stats, indent=2).replace("\n", "\n        "))
+    finally:
+        if workers > 1:
+            pool.shutdown()
+
+    total = time.perf_counter() - start
+    print(f"{len(jobs) - failed}/{len(jobs)} files converted in {total:.2f}s using {split or workers} worker(s)")
+    return 1 if failed else 0
+
+
+# ==================== Hot Folder ====================
+
+DEFAULT_INDEX_PATH = os.path.join(DEFAULT_CACHE_DIR, "hotfolder-index.json")
+
+
+class HotFolderWatcher:
+    """Converts G-code files dropped into watched directories, unattended
+
+    The directories are polled; a new or changed file is converted once its
+    size and modification time have stayed the same for settle_s seconds,
+    so files still being written are left alone. Conversions run on a
+    process pool of at most `workers` jobs. Every finished file is recorded
+    in a persistent index (path, size, mtime, content hash, settings), so a
+    restart skips it and a file touched without changing its content is not
+    converted again. The settings are read again on every scan, so editing
+    them converts the files again; entries of deleted files are dropped.
+    """
+
+    EXTENSIONS = ('.nc', '.cnc', '.gcode')
+
+    def __init__(self, directories, output_dir=None, setting_file=None, options=None, cache=None, workers=None,
+                 index_path=DEFAULT_INDEX_PATH, settle_s=2.0, callback_log=print):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.output_dir = output_dir
+        self.setting_file = setting_file
+        self.options = options or {}
+        self.cache = cache
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.index_path = index_path
+        self.settle_s = settle_s
+        self.callback_log = callback_log
+
+        self.index = self.load_index()
+        self.settings = self.current_settings()
+        self.changing = {}  # path -> ((size, mtime_ns), monotonic time it was last seen changing)
+        self.queued = []  # (path, signature, digest) ready to convert, oldest first
+        self.running = {}  # future -> (path, signature, digest, settings)
+        self.pool = None
+        if self.prune_index(list(self.index)):
+            self.save_index()
+
+    def log(self, message):
+        if self.callback_log:
+            self.callback_log(message)
+
+    def current_settings(self):
+        """Effective settings the conversions run with, recorded in the index"""
+        converter = GCode2RMLConverter()
+        converter.overrides = self.options
+        converter.load_settings(self.setting_file)
+        return converter.effective_settings()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.log(f"Ignoring unreadable index {self.index_path}: {e}")
+            return {}
+
+    def save_index(self):
+        directory = os.path.dirname(self.index_path)
+        temp_path = None
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = temp_file_for(self.index_path)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, indent=1)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            self.log(f"Could not save index {self.index_path}: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def prune_index(self, paths):
+        """Drop the index entries of the given paths whose file was deleted, returning whether any was
+
+        A path whose directory is gone as well (e.g. an unmounted share) is kept.
+        """
+        pruned = False
+        for path in paths:
+            if not os.path.exists(path) and os.path.isdir(os.path.dirname(path)):
+                del self.index[path]
+                pruned = True
+        return pruned
+
+    @staticmethod
+    def file_digest(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(functools.partial(f.read, 1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def up_to_date(self, entry):
+        """Whether an index entry was processed under the current settings and its output is still there
+
+        Failed files count as processed: they are retried once they change.
+        """
+        return (entry["version"] == CONVERTER_VERSION and entry["settings"] == self.settings
+                and (not entry["success"] or os.path.exists(entry["output"])))
+
+    def is_done(self, path, signature):
+        entry = self.index.get(path)
+        return entry is not None and (entry["size"], entry["mtime_ns"]) == signature and self.up_to_date(entry)
+
+    def candidates(self):
+        """(path, (size, mtime_ns)) of the G-code files in the watched directories"""
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                self.log(f"Cannot read {directory}: {e}")
+                continue
+            for entry in entries:
+                if not entry.name.lower().endswith(self.EXTENSIONS) or entry.name.startswith('.'):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue  # removed meanwhile
+                yield entry.path, (stat.st_size, stat.st_mtime_ns)
+
+    def scan(self, now):
+        """Queue the files that changed and have settled since the last scan"""
+        settings = self.current_settings()
+        if settings != self.settings:
+            self.log("Settings changed, converting the watched files again")
+            self.settings = settings
+
+        busy = {path for path, _, _ in self.queued}
+        busy.update(path for path, _, _, _ in self.running.values())
+        listed = set()
+        for path, signature in self.candidates():
+            listed.add(path)
+            if path in busy or self.is_done(path, signature):
+                self.changing.pop(path, None)
+                continue
+            seen = self.changing.get(path)
+            if seen is None or seen[0] != signature:
+                self.changing[path] = (signature, now)
+                continue
+            if now - seen[1] < self.settle_s:
+                continue
+            del self.changing[path]
+
+            try:
+                digest = self.file_digest(path)
+            except OSError as e:
+                self.log(f"Cannot read {path}: {e}")
+                continue
+            entry = self.index.get(path)
+            if entry is not None and entry["hash"] == digest and self.up_to_date(entry):
+                # Touched but unchanged: only remember the new signature
+                entry["size"], entry["mtime_ns"] = signature
+                self.save_index()
+                continue
+            self.queued.append((path, signature, digest))
+
+        for path in [path for path in self.changing if path not in listed]:
+            del self.changing[path]
+        directories = set(self.directories)
+        if self.prune_index([path for path in self.index
+                             if path not in listed and os.path.dirname(path) in directories]):
+            self.save_index()
+
+    def dispatch(self):
+        """Start queued conversions while workers are free"""
+        while self.queued and len(self.running) < self.workers:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            path, signature, digest = self.queued.pop(0)
+            output_path = os.path.abspath(output_path_for(path, self.output_dir))
+            job = (path, output_path, self.setting_file, self.options, self.cache, False, 0, False)
+            self.running[self.pool.submit(convert_file, job)] = (path, signature, digest, self.settings)
+
+    def collect(self):
+        """Record finished conversions in the index"""
+        for future in [future for future in self.running if future.done()]:
+            path, signature, digest, settings = self.running.pop(future)
+            try:
+                input_path, output_path, success, elapsed, messages, _ = future.result()
+            except Exception as e:
+                success, elapsed, messages, output_path = False, 0.0, [f"Error: {e}"], None
+            status = "OK" if success else "FAILED"
+            self.log(f"{status:<6} {elapsed:8.2f}s  {path} -> {output_path}")
+            if not success:
+                for message in messages:
+                    self.log("        " + message.replace("\n", "\n        "))
+            self.index[path] = {
+                "size": signature[0],
+                "mtime_ns": signature[1],
+                "hash": digest,
+                "version": CONVERTER_VERSION,
+                "settings": settings,
+                "output": output_path if success else "",
+                "success": success,
+            }
+            self.save_index()
+
+    def poll(self):
+        self.collect()
+        self.scan(time.monotonic())
+        self.dispatch()
+
+    def run(self, poll_s=1.0):
+        """Watch until interrupted, then finish the running conversions"""
+        self.log(f"Watching {', '.join(self.directories)} (Ctrl+C to stop)")
+        try:
+            while True:
+                self.poll()
+                time.sleep(poll_s)
+        except KeyboardInterrupt:
+            self.log("Stopping, waiting for running conversions...")
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(wait=True)
+                self.collect()
+
+
+# ==================== Entry Point ====================
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        sys.exit(run_cli())
+
+    # Create default settings file if it doesn't exist
+    setting_file = "setting.txt"
+    if not os.path.exists(setting_file):
+        default_settings = """# Home position
+homePosition = ( 0.0, 0.0, 0.0)
+
+# Output coordinate offset
+posOffset = ( 0.0, 0.0, 0.0 );
+
+# Rapid movement speed
+rapidFeedSpeed = 1000.0
+
+# Circular interpolation resolution (number of divisions per revolution)
+circularResolution = 360.0
+
+# Maximum chord deviation of arc segments in mm (0: use circularResolution)
+arcChordTolerance = 0.0
+
+# Drop duplicate points and merge collinear moves (0: off / 1: on)
+compactMoves = 0
+
+# Maximum deviation of merged moves in mm
+compactTolerance = 0.0
+
+# Exact integer coordinates, rounding negative values symmetrically (0: off / 1: on)
+fixedPoint = 0
+
+# Reorder cut segments to shorten the rapid travel between them (0: off / 1: on)
+optimizeRapids = 0
+
+# Rapid height separating cut segments (auto: the most common rapid height)
+safeZ = auto
+
+# Acceleration for machining time estimates in mm/s^2 (0: moves at constant feed)
+acceleration = 0.0
+
+# Work area checked by estimates, in mm from the origin (0: axis not checked)
+workArea = ( 0.0, 0.0, 0.0 )
+"""
+        with open(setting_file, 'w', encoding='utf-8') as f:
+            f.write(default_settings)
+
+    # Launch GUI
+    if tk is None:
+        print("Tkinter is not available, use the command line (see --help)", file=sys.stderr)
+        sys.exit(1)
+    app = GCodeConverterGUI()
+    app.run()
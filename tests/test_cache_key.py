@@ -0,0 +1,101 @@
+"""The conversion cache key must change whenever a setting changes the RML"""
+import os
+import re
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import GCode2RMLConverter, ConversionCache, DEFAULT_SETTING_FILE, np
+
+# Rapids at a safe height between cut segments, arcs, collinear and duplicate
+# moves, negative half-unit coordinates and a return home
+PROGRAM = """G90 G21 G17
+G0 Z5
+G0 X10 Y10
+G1 Z-1 F300
+G1 X12 Y10
+G1 X14 Y10
+G1 X14 Y10
+G1 X16 Y10.004
+G2 X20 Y14 I0 J4
+G3 X24 Y18 I4 J0
+G0 Z5
+G0 X-0.125 Y-0.375
+G1 Z-0.5 F200
+G1 X-5.125 Y-0.375
+G0 Z5
+G0 X30 Y2
+G1 Z-1 F300
+G1 X35 Y2
+G0 Z5
+G28 X0 Y0 Z5
+M30
+"""
+
+# Setting -> (lines for the base settings, lines for the changed settings)
+VARIANTS = {
+    "homePosition": ("homePosition = (0, 0, 0)", "homePosition = (1, 2, 3)"),
+    "posOffset": ("posOffset = (0, 0, 0)", "posOffset = (1, 0, 0)"),
+    "rapidFeedSpeed": ("rapidFeedSpeed = 1000", "rapidFeedSpeed = 2000"),
+    "circularResolution": ("circularResolution = 360", "circularResolution = 90"),
+    "arcChordTolerance": ("arcChordTolerance = 0", "arcChordTolerance = 0.05"),
+    "compactMoves": ("compactMoves = 0", "compactMoves = 1"),
+    "compactTolerance": ("compactMoves = 1\ncompactTolerance = 0", "compactMoves = 1\ncompactTolerance = 0.05"),
+    "fixedPoint": ("fixedPoint = 0", "fixedPoint = 1"),
+    "optimizeRapids": ("optimizeRapids = 0", "optimizeRapids = 1"),
+    "safeZ": ("optimizeRapids = 1\nsafeZ = auto", "optimizeRapids = 1\nsafeZ = 8"),
+    "acceleration": ("acceleration = 0", "acceleration = 500"),
+    "workArea": ("workArea = (0, 0, 0)", "workArea = (10, 10, 10)"),
+}
+
+
+class CacheKeyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.directory, "job.nc")
+        with open(self.input_path, 'w', encoding='utf-8') as f:
+            f.write(PROGRAM)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def convert(self, settings, name, arc_engine=None):
+        """RML and cache key of PROGRAM converted with the given setting lines"""
+        setting_path = os.path.join(self.directory, name + ".txt")
+        with open(setting_path, 'w', encoding='utf-8') as f:
+            f.write(settings + "\n")
+        output_path = os.path.join(self.directory, name + ".rml")
+        converter = GCode2RMLConverter()
+        if arc_engine:
+            converter.arc_engine = arc_engine
+        self.assertTrue(converter.convert(self.input_path, output_path, setting_path))
+        with open(output_path, 'r', encoding='utf-8') as f:
+            rml = f.read()
+        return rml, ConversionCache(self.directory).key(self.input_path, converter.effective_settings())
+
+    def test_variants_cover_every_setting(self):
+        with open(DEFAULT_SETTING_FILE, 'r', encoding='utf-8') as f:
+            names = set(re.findall(r"^(\w+)\s*=", f.read(), re.MULTILINE))
+        self.assertEqual(names, set(VARIANTS))
+
+    def test_output_changes_change_the_key(self):
+        for name, (base, changed) in VARIANTS.items():
+            with self.subTest(setting=name):
+                base_rml, base_key = self.convert(base, "base")
+                changed_rml, changed_key = self.convert(changed, "changed")
+                if base_rml != changed_rml:
+                    self.assertNotEqual(base_key, changed_key)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_arc_engines_match(self):
+        # The arc engine is not part of the key, so both must generate the same RML
+        for settings in ("circularResolution = 3600", "arcChordTolerance = 0.001", "fixedPoint = 1"):
+            with self.subTest(settings=settings):
+                self.assertEqual(self.convert(settings, "numpy", 'numpy'), self.convert(settings, "python", 'python'))
+
+
+if __name__ == "__main__":
+    unittest.main()
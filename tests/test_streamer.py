@@ -0,0 +1,154 @@
+"""Streaming RML to a device, using a pseudo-terminal as the machine"""
+import os
+import sys
+import time
+import select
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import GCode2RMLConverter, RMLStreamer, DEFAULT_SETTING_FILE
+
+try:
+    import pty
+except ImportError:  # not on Windows
+    pty = None
+
+
+def program(lines):
+    """A zigzag of G01 moves, long enough to fill the streamer's buffer many times"""
+    yield "G90 G21 G17"
+    yield "M3 S12000"
+    yield "G0 X0 Y0 Z5"
+    yield "G1 Z-1 F300"
+    for n in range(lines):
+        yield f"G1 X{n % 100}.{n % 7} Y{n // 100}.{n % 3} F{300 + n % 2 * 100}"
+    yield "G0 Z5"
+    yield "M5"
+
+
+def pockets(count):
+    """Cut segments scattered out of order, for the rapid optimizer to reorder"""
+    yield "G90 G21 G17"
+    yield "M3 S12000"
+    for n in range(count):
+        x, y = n * 37 % 90, n * 53 % 70
+        yield "G0 Z5"
+        yield f"G0 X{x} Y{y}"
+        yield "G1 Z-1 F300"
+        yield f"G2 X{x + 4} Y{y} I2 J0 F400"
+        yield f"G1 X{x + 4} Y{y + 3}"
+    yield "G0 Z5"
+    yield "M5"
+
+
+class Machine:
+    """Reads everything written to the slave side of a pseudo-terminal"""
+
+    def __init__(self):
+        self.master, self.slave = pty.openpty()
+        self.device = os.ttyname(self.slave)
+        self.received = bytearray()
+        self.stopped = False
+        self.reader = threading.Thread(target=self.read, daemon=True)
+        self.reader.start()
+
+    def read(self):
+        while not self.stopped:
+            ready, _, _ = select.select([self.master], [], [], 0.05)
+            if ready:
+                try:
+                    self.received.extend(os.read(self.master, 4096))
+                except OSError:
+                    break
+
+    def wait_for(self, size, timeout=20.0):
+        deadline = time.monotonic() + timeout
+        while len(self.received) < size and time.monotonic() < deadline:
+            time.sleep(0.02)
+        return len(self.received)
+
+    def close(self):
+        self.stopped = True
+        self.reader.join(1.0)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+@unittest.skipIf(pty is None, "pseudo-terminals are not available")
+class StreamerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.directory, "job.nc")
+        with open(self.input_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(program(3000)) + "\n")
+        self.output_path = os.path.join(self.directory, "job.rml")
+        self.assertTrue(GCode2RMLConverter().convert(self.input_path, self.output_path, DEFAULT_SETTING_FILE))
+        with open(self.output_path, 'rb') as f:
+            self.expected = f.read()
+        self.machine = Machine()
+
+    def tearDown(self):
+        self.machine.close()
+        shutil.rmtree(self.directory)
+
+    def send(self, streamer):
+        """Start sending the job in a thread, returning the thread and its result list"""
+        result = []
+        converter = GCode2RMLConverter()
+        thread = threading.Thread(target=lambda: result.append(
+            converter.send(self.input_path, streamer, DEFAULT_SETTING_FILE)), daemon=True)
+        thread.start()
+        return thread, result
+
+    def test_send_matches_file(self):
+        streamer = RMLStreamer(self.machine.device, 9600, 'none')
+        thread, result = self.send(streamer)
+        thread.join(30.0)
+        self.assertEqual(result, [True])
+        self.machine.wait_for(len(self.expected))
+        self.assertEqual(bytes(self.machine.received), self.expected)
+        self.assertEqual(streamer.sent, len(self.expected))
+
+    def test_send_with_optimized_rapids(self):
+        with open(self.input_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(pockets(40)) + "\n")
+        setting_path = os.path.join(self.directory, "setting.txt")
+        with open(setting_path, 'w', encoding='utf-8') as f:
+            f.write("optimizeRapids = 1\n")
+        self.assertTrue(GCode2RMLConverter().convert(self.input_path, self.output_path, setting_path))
+        with open(self.output_path, 'rb') as f:
+            expected = f.read()
+        self.assertTrue(GCode2RMLConverter().convert(self.input_path, self.output_path, DEFAULT_SETTING_FILE))
+        with open(self.output_path, 'rb') as f:
+            self.assertNotEqual(f.read(), expected)  # the optimizer reordered the segments
+
+        streamer = RMLStreamer(self.machine.device, 9600, 'none')
+        self.assertTrue(GCode2RMLConverter().send(self.input_path, streamer, setting_path))
+        self.machine.wait_for(len(expected))
+        self.assertEqual(bytes(self.machine.received), expected)
+
+    def test_pause_and_resume(self):
+        streamer = RMLStreamer(self.machine.device, 9600, 'none', buffer_size=512, packet_size=64)
+        thread, result = self.send(streamer)
+        self.machine.wait_for(1024)
+        streamer.pause()
+        time.sleep(0.2)  # a packet being written when pausing still completes
+        held = len(self.machine.received)
+        time.sleep(0.5)
+        self.assertEqual(len(self.machine.received), held)
+        self.assertLess(held, len(self.expected))
+        self.assertTrue(thread.is_alive())  # the conversion waits for room in the buffer
+
+        streamer.resume()
+        thread.join(30.0)
+        self.assertEqual(result, [True])
+        self.machine.wait_for(len(self.expected))
+        self.assertEqual(bytes(self.machine.received), self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()